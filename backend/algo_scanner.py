@@ -8,6 +8,8 @@ import sys
 import json
 import logging
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 import subprocess
@@ -15,24 +17,31 @@ from pathlib import Path
 
 # Adjust imports to use the local modules we just created
 from .gemini_client import gemini_client
+from .portfolio_prompt import build_portfolio_prompt, PORTFOLIO_PROMPT_TOKEN_BUDGET
 from .algo_data_manager import AlgoDataManager
 
 # Import MarketAlgoX modules
 # Since we are inside backend package, we can use relative imports
 from .market_algo_x.ibd_screeners import IBDScreeners
 from .market_algo_x.ibd_data_collector import IBDDataCollector
-from .market_algo_x.ibd_database import IBDDatabase
+from .market_algo_x.ibd_database import IBDDatabase, DatabaseNotFoundError
+from .market_algo_x.ibd_feature_snapshot import feature_snapshot
 
 # Import StageAlgo modules
-from .stage_algo.gamma_plotter import GammaPlotter
-from .stage_algo.quantlib_ai_analyzer import QuantLibAnalyzer
-from .stage_algo.quantlib_timeseries_analyzer import TimeSeriesQuantLibAnalyzer
+from .stage_algo.symbol_analysis import run_stage_algo_tools
 
 logger = logging.getLogger(__name__)
 
 # Paths
 CHARTS_ALGO_PATH = os.getenv("CHARTS_ALGO_PATH", "/app/frontend/charts/algo")
 
+# StageAlgo分析の並列プロセス数
+ALGO_ANALYSIS_WORKERS = int(os.getenv("ALGO_ANALYSIS_WORKERS", "4"))
+
+# Gemini銘柄解説の1リクエストあたりの銘柄数と、解説が欠けた銘柄の再生成を含む最大試行回数
+GEMINI_ANALYSIS_CHUNK_SIZE = int(os.getenv("GEMINI_ANALYSIS_CHUNK_SIZE", "5"))
+GEMINI_ANALYSIS_MAX_ATTEMPTS = 3
+
 # Metric Descriptions for Gemini Prompt
 METRIC_DESCRIPTIONS = {
     "momentum_rank_1w": "1週間モメンタムランク (0-100)",
@@ -53,6 +62,12 @@ METRIC_DESCRIPTIONS = {
     "expected_move_30d": "30日予想変動幅(%)"
 }
 
+# Geminiプロンプトのテンプレートバージョン（文面を変更したら上げる。生成結果のキャッシュキーに含まれる）
+GEMINI_PROMPT_VERSIONS = {
+    "screener_analysis": 2,
+    "portfolio": 2,
+}
+
 class AlgoScanner:
     def __init__(self):
         self.data_manager = AlgoDataManager()
@@ -81,13 +96,41 @@ class AlgoScanner:
         summary = {}
         volatility_distribution = {"contraction": 0, "transition": 0, "expansion": 0}
 
+        # 複数のスクリーナーに含まれる銘柄も1回だけ分析する
+        unique_tickers = []
+        for items in market_data.values():
+            for item in items:
+                ticker = item.get('ticker') if isinstance(item, dict) else str(item)
+                if ticker and ticker not in unique_tickers:
+                    unique_tickers.append(ticker)
+        logger.info(f"Analyzing {len(unique_tickers)} unique symbols from {len(market_data)} screeners")
+
+        analysis_results = await self.analyze_symbols(unique_tickers)
+
         # Initialize Database connection for profile fetching
-        db = IBDDatabase()
+        db = IBDDatabase(read_only=True)
 
         try:
+            # 前回スキャンからの変化（新規該当・除外銘柄、レーティングの大きな変化）
+            changes = self.get_scan_changes(db)
+
+            # 銘柄ごとのプロファイルと現在価格（ポートフォリオのエントリー価格用）
+            symbol_info = {}
+            for ticker in unique_tickers:
+                try:
+                    profile = db.get_company_profile(ticker)
+                    price_data = db.get_price_history(ticker, days=1)
+                    symbol_info[ticker] = {
+                        'sector': profile.get('sector', 'Unknown') if profile else 'Unknown',
+                        'industry': profile.get('industry', 'Unknown') if profile else 'Unknown',
+                        'price': price_data.iloc[0]['close'] if price_data is not None and not price_data.empty else None
+                    }
+                except Exception as e:
+                    logger.error(f"Error loading profile for {ticker}: {e}")
+
             for screener_key, items in market_data.items():
                 # items is now list of dicts: [{'ticker': 'AAPL', 'rank_1w': 99}, ...]
-                logger.info(f"Analyzing screener: {screener_key} ({len(items)} symbols)")
+                logger.info(f"Merging screener: {screener_key} ({len(items)} symbols)")
 
                 analyzed_symbols = []
 
@@ -99,77 +142,63 @@ class AlgoScanner:
                         ticker = str(item)
                         item = {} # Empty dict if simple string
 
-                    if not ticker:
-                        continue
-
-                    try:
-                        # Fetch profile
-                        profile = db.get_company_profile(ticker)
-                        sector = profile.get('sector', 'Unknown') if profile else 'Unknown'
-                        industry = profile.get('industry', 'Unknown') if profile else 'Unknown'
-
-                        # Fetch current price (for portfolio entry price)
-                        price_data = db.get_price_history(ticker, days=1)
-                        current_price = price_data.iloc[0]['close'] if price_data is not None and not price_data.empty else None
-
-                        # StageAlgoで分析
-                        analysis_result = await self.analyze_symbol(ticker)
-
-                        if analysis_result:
-                            # スクリーナー情報をマージ
-                            # item (from screener) + profile + analysis_result
-                            merged_data = {
-                                'symbol': ticker, # Keep compatibility
-                                'sector': sector,
-                                'industry': industry,
-                                'price': current_price,
-                                **item, # Include all metrics from screener
-                                **analysis_result
-                            }
-                            analyzed_symbols.append(merged_data)
-                        # ボラティリティ分布を集計
-                        regime = analysis_result.get('volatility_regime', 'transition')
-                        volatility_distribution[regime] = volatility_distribution.get(regime, 0) + 1
-
-                    except Exception as e:
-                        logger.error(f"Error analyzing {ticker}: {e}")
+                    analysis_result = analysis_results.get(ticker)
+                    if not analysis_result or ticker not in symbol_info:
                         continue
 
-                # バッチでGemini解説を生成
-                if analyzed_symbols:
-                    gemini_results = await self.generate_batch_gemini_analysis(screener_key, analyzed_symbols)
-
-                    # 結果を統合して保存
-                    for symbol_data in analyzed_symbols:
-                        ticker = symbol_data['ticker']
-                        gemini_analysis = gemini_results.get(ticker)
-
-                        # リスト内のデータにも解説を追加（フロントエンド表示用）
-                        symbol_data['gemini_analysis'] = gemini_analysis
+                    # スクリーナー情報をマージ
+                    # item (from screener) + profile + analysis_result
+                    merged_data = {
+                        'symbol': ticker, # Keep compatibility
+                        **symbol_info[ticker],
+                        'is_new': ticker in changes['screeners'].get(screener_key, {}).get('entered', []),
+                        **item, # Include all metrics from screener
+                        **analysis_result
+                    }
+                    analyzed_symbols.append(merged_data)
 
-                        # 個別銘柄データを保存
-                        self.data_manager.save_symbol_data(ticker, {
-                            **symbol_data,
-                            'gemini_analysis': gemini_analysis,
-                            'screener_sources': [screener_key],
-                            'last_updated': datetime.now().isoformat()
-                        })
+                    # ボラティリティ分布を集計
+                    regime = analysis_result.get('volatility_regime', 'transition')
+                    volatility_distribution[regime] = volatility_distribution.get(regime, 0) + 1
 
                 summary[screener_key] = analyzed_symbols
         finally:
             if 'db' in locals():
                 db.close()
 
+        # スクリーナーごとのGemini解説を並行して生成（同時実行数はGeminiClientが制限）
+        screener_keys = [key for key, symbols in summary.items() if symbols]
+        gemini_outputs = await asyncio.gather(
+            *(self.generate_batch_gemini_analysis(key, summary[key]) for key in screener_keys)
+        )
+        for screener_key, gemini_results in zip(screener_keys, gemini_outputs):
+            # 結果を統合して保存
+            for symbol_data in summary[screener_key]:
+                ticker = symbol_data['ticker']
+                gemini_analysis = gemini_results.get(ticker)
+
+                # リスト内のデータにも解説を追加（フロントエンド表示用）
+                symbol_data['gemini_analysis'] = gemini_analysis
+
+                # 個別銘柄データを保存
+                self.data_manager.save_symbol_data(ticker, {
+                    **symbol_data,
+                    'gemini_analysis': gemini_analysis,
+                    'screener_sources': [screener_key],
+                    'last_updated': datetime.now().isoformat()
+                })
+
         # 3. ポートフォリオ生成 (全スクリーナーの結果から)
         all_analyzed_symbols = []
-        seen_tickers = set()
-        for symbols in summary.values():
+        screener_hits = {}
+        for screener_key, symbols in summary.items():
             for symbol_data in symbols:
-                if symbol_data['ticker'] not in seen_tickers:
+                if symbol_data['ticker'] not in screener_hits:
                     all_analyzed_symbols.append(symbol_data)
-                    seen_tickers.add(symbol_data['ticker'])
+                    screener_hits[symbol_data['ticker']] = []
+                screener_hits[symbol_data['ticker']].append(screener_key)
 
-        portfolios = await self.generate_portfolio_recommendations(all_analyzed_symbols)
+        portfolios = await self.generate_portfolio_recommendations(all_analyzed_symbols, screener_hits)
 
         # 4. サマリーを保存
         summary_data = {
@@ -178,16 +207,36 @@ class AlgoScanner:
             'scan_time': datetime.now().strftime('%H:%M:%S'),
             'total_scanned': sum(len(symbols) for symbols in summary.values()),
             'summary': summary,
+            'changes': changes,
             'volatility_distribution': volatility_distribution,
             'updated_at': datetime.now().isoformat()
         }
 
         self.data_manager.save_daily_summary(summary_data)
+        gemini_client.cache.purge_expired()
 
         logger.info(f"Algo scan completed: {summary_data['total_scanned']} symbols analyzed")
 
         return summary_data
 
+    def get_scan_changes(self, db: IBDDatabase, min_rating_change: int = 5, limit: int = 50) -> Dict:
+        """
+        直近2回のスナップショットを比較し、スクリーナーの入れ替わりとレーティングの変化を取得
+
+        Returns:
+            {'screeners': {screener: {'entered': [...], 'left': [...]}}, 'rating_changes': [...]}
+        """
+        try:
+            screener_changes = db.get_screener_changes()
+            rating_changes = db.get_rating_changes(min_change=min_rating_change).head(limit)
+            return {
+                'screeners': screener_changes,
+                'rating_changes': rating_changes.astype(object).where(rating_changes.notna(), None).to_dict('records')
+            }
+        except Exception as e:
+            logger.error(f"Error loading scan changes: {e}")
+            return {'screeners': {}, 'rating_changes': []}
+
     async def run_market_algox(self) -> Dict[str, List[Dict]]:
         """
         MarketAlgoXのデータ収集とスクリーニングを実行
@@ -214,14 +263,27 @@ class AlgoScanner:
 
                 # 2. Screening
                 logger.info("Running MarketAlgoX Screeners...")
-                screeners = IBDScreeners()
+                screeners = IBDScreeners(read_only=True)
                 results = screeners.run_all_screeners()
                 screeners.close()
+
+                # 3. 前日との差分用にスクリーナー結果を保存
+                db = IBDDatabase(silent=True)
+                try:
+                    db.save_screener_snapshot(results)
+                finally:
+                    db.close()
+
+                # /api/algo/screen のメモリ上の特徴量を更新させる
+                feature_snapshot.invalidate()
                 return results
 
             results = await loop.run_in_executor(None, collect_and_screen)
             return results
 
+        except DatabaseNotFoundError as e:
+            logger.warning(f"MarketAlgoX screening skipped: {e}")
+            return {}
         except Exception as e:
             logger.error(f"MarketAlgoX run failed: {e}")
             return {}
@@ -232,60 +294,50 @@ class AlgoScanner:
         """
         try:
             loop = asyncio.get_event_loop()
-
-            def run_stage_algo_tools():
-                # 1. Gamma Plotter
-                gp = GammaPlotter(ticker)
-                if gp.fetch_data():
-                    gp.calculate_current_gamma_levels()
-                    gp.calculate_historical_metrics()
-                    gamma_plot_path = gp.plot_analysis(output_dir=CHARTS_ALGO_PATH)
-                    gamma_flip = gp.gamma_flip
-                else:
-                    gamma_plot_path = None
-                    gamma_flip = None
-
-                # 2. QuantLib AI Analyzer
-                qa = QuantLibAnalyzer(ticker)
-                ai_strategy = qa.run() # Returns dict
-
-                # 3. Time Series Analyzer
-                ts = TimeSeriesQuantLibAnalyzer(ticker)
-                if ts.fetch_history():
-                    ts.calculate_metrics()
-                    ts_plot_path = ts.plot_analysis(output_dir=CHARTS_ALGO_PATH)
-                    ts_report = ts.generate_report()
-                    volatility_regime = ts_report.get('cycle_phase', 'transition').lower()
-                    if 'contraction' in volatility_regime: volatility_regime = 'contraction'
-                    elif 'expansion' in volatility_regime: volatility_regime = 'expansion'
-                    else: volatility_regime = 'transition'
-
-                    expected_move = ts_report.get('expected_move_30d')
-                else:
-                    ts_plot_path = None
-                    volatility_regime = 'transition'
-                    expected_move = None
-
-                return {
-                    'volatility_regime': volatility_regime,
-                    'gamma_flip': gamma_flip,
-                    'expected_move_30d': expected_move,
-                    'analysis_data': {
-                        'gamma_plot': f'/charts/algo/{os.path.basename(gamma_plot_path)}' if gamma_plot_path else None,
-                        'timeseries_plot': f'/charts/algo/{os.path.basename(ts_plot_path)}' if ts_plot_path else None,
-                        'ai_strategy': ai_strategy
-                    }
-                }
-
-            return await loop.run_in_executor(None, run_stage_algo_tools)
+            return await loop.run_in_executor(None, run_stage_algo_tools, ticker, CHARTS_ALGO_PATH)
 
         except Exception as e:
             logger.error(f"Error analyzing {ticker}: {e}")
             return None
 
-    async def generate_portfolio_recommendations(self, all_symbols: List[Dict]) -> Dict:
+    async def analyze_symbols(self, tickers: List[str]) -> Dict[str, Dict]:
+        """
+        複数銘柄をプロセスプールで並列に分析（各銘柄1回のみ）
+
+        QuantLibの評価日とmatplotlibはプロセス全体の状態のため、スレッドではなく
+        プロセスで並列化する。
+
+        Returns:
+            Dict[ticker, 分析結果]（失敗した銘柄は含まない）
+        """
+        if not tickers:
+            return {}
+
+        loop = asyncio.get_event_loop()
+        workers = max(1, min(ALGO_ANALYSIS_WORKERS, len(tickers)))
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [
+                loop.run_in_executor(pool, run_stage_algo_tools, ticker, CHARTS_ALGO_PATH)
+                for ticker in tickers
+            ]
+            for ticker, outcome in zip(tickers, await asyncio.gather(*futures, return_exceptions=True)):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Error analyzing {ticker}: {outcome}")
+                elif outcome:
+                    results[ticker] = outcome
+
+        logger.info(f"StageAlgo analysis completed: {len(results)}/{len(tickers)} symbols ({workers} workers)")
+        return results
+
+    async def generate_portfolio_recommendations(self, all_symbols: List[Dict],
+                                                 screener_hits: Optional[Dict[str, List[str]]] = None) -> Dict:
         """
         全抽出銘柄から3つのポートフォリオ（Aggressive, Balanced, Defensive）を生成
+
+        Args:
+            all_symbols: 分析済みの全銘柄（重複なし）
+            screener_hits: ticker -> 該当スクリーナー名のリスト（候補の優先度付けに使用）
         """
         if not all_symbols:
             return {}
@@ -295,78 +347,40 @@ class AlgoScanner:
             prev_summary = self.data_manager.load_previous_daily_summary()
             prev_portfolios = prev_summary.get('portfolios', {}) if prev_summary else {}
 
-            # 2. プロンプト用データ構築
-            candidates = []
-            for item in all_symbols:
-                candidates.append({
-                    "ticker": item['ticker'],
-                    "price": item.get('price'), # 現在価格（終値）
-                    "sector": item.get('sector'),
-                    "industry": item.get('industry'),
-                    "volatility_regime": item.get('volatility_regime'),
-                    "gemini_analysis": item.get('gemini_analysis') # 個別分析結果も参考にする
-                })
-
-            # 前回データがない場合のメッセージ
-            if not prev_portfolios:
-                prev_portfolio_text = "（データなし：今回は初回構築、または前回データが不足しているため、すべての銘柄を新規採用の候補として扱ってください）"
-            else:
-                prev_portfolio_text = json.dumps(prev_portfolios, ensure_ascii=False, indent=2)
-
-            prompt = f"""
-あなたはプロのポートフォリオマネージャーです。
-以下の抽出された有望銘柄リスト（候補銘柄）から、リスク許容度の異なる3つのモデルポートフォリオ（Aggressive, Balanced, Defensive）を構築してください。
-また、前回のポートフォリオ構成と比較して、変更点（新規採用、除外、継続）とその理由を解説してください。
-
-【候補銘柄リスト (今回の購入可能銘柄)】
-{json.dumps(candidates, ensure_ascii=False, indent=2)}
-
-【前回のポートフォリオ構成】
-{prev_portfolio_text}
-
-【要件】
-1. **Aggressive Portfolio**: ハイリスク・ハイリターン。成長性やモメンタムを重視。
-2. **Balanced Portfolio**: リスクとリターンのバランスを重視。分散投資。
-3. **Defensive Portfolio**: 安定性重視。ボラティリティが低い、またはディフェンシブなセクター。
-
-【制約】
-- ショート（空売り）は絶対に行わず、ロング（買い）のみで構成すること。
-- 各ポートフォリオは最大10銘柄まで（良い銘柄がなければ少なくても可、0でも可）。
-- 各ポートフォリオ内での配分比率（percentage）を決めること（合計100%になるように）。
-- **entry_price** には、候補銘柄リストにある `price` を使用すること。
-- **commentary** には、前回のポートフォリオからの変更理由を記述すること。
-  - 例: 「NVDAを新規採用（モメンタム強）、AAPLは候補から外れたため除外（利確/損切り）」など。
-  - 今回が初回（前回データなし）の場合は、すべての銘柄を新規採用として扱い、選定理由を記述すること。
-- 出力は**必ず以下のJSON形式**のみとすること。Markdownコードブロックは不要。
-
-{{
-  "aggressive": {{
-    "allocations": [
-        {{ "ticker": "AAPL", "percentage": 40, "entry_price": 150.5 }},
-        {{ "ticker": "NVDA", "percentage": 60, "entry_price": 400.0 }}
-    ],
-    "commentary": "ポートフォリオの変更点と選定理由の解説..."
-  }},
-  "balanced": {{
-    "allocations": [ ... ],
-    "commentary": "..."
-  }},
-  "defensive": {{ ... }}
-}}
-"""
-            response_text = gemini_client.generate_content(prompt)
+            # 2. 候補銘柄をコンパクトなレコードにしてトークン予算内のプロンプトを作成
+            built = build_portfolio_prompt(all_symbols, prev_portfolios, screener_hits)
+            logger.info(f"Portfolio prompt: {built['included']}/{len(all_symbols)} candidates "
+                        f"({built['omitted']} omitted), ~{built['estimated_tokens']} tokens "
+                        f"(budget {PORTFOLIO_PROMPT_TOKEN_BUDGET})")
+            prompt = built['prompt']
+
+            cache_key = gemini_client.cache_key(
+                'portfolio', GEMINI_PROMPT_VERSIONS['portfolio'],
+                {'candidates': built['candidates'], 'previous': built['previous']}
+            )
+            response_text = await gemini_client.generate_content_async(prompt, cache_key=cache_key)
             if not response_text:
                 return {}
 
             clean_text = response_text.replace('```json', '').replace('```', '').strip()
-            return json.loads(clean_text)
+            try:
+                return json.loads(clean_text)
+            except json.JSONDecodeError:
+                # 使えない応答はキャッシュから外し、次回は再生成する
+                gemini_client.cache.delete(cache_key)
+                raise
 
         except Exception as e:
             logger.error(f"Error generating portfolio recommendations: {e}")
             return {}
 
     async def generate_batch_gemini_analysis(self, screener_key: str, symbols_data: List[Dict]) -> Dict[str, str]:
-        """Gemini APIで一括解説生成"""
+        """
+        Gemini APIで銘柄ごとの解説を生成
+
+        銘柄を GEMINI_ANALYSIS_CHUNK_SIZE 件ずつのチャンクに分けて並行に生成し、
+        チャンクごとに検証する。解説が得られなかった銘柄だけを、より小さいチャンクで再生成する。
+        """
         try:
             # プロンプト用のデータを構築
             prompt_data = []
@@ -394,10 +408,40 @@ class AlgoScanner:
 
                 prompt_data.append(p_item)
 
-            # Definitions for the prompt
-            definitions_text = "\n".join([f"- {k}: {v}" for k, v in METRIC_DESCRIPTIONS.items()])
+            results = {}
+            pending = prompt_data
+            chunk_size = max(1, GEMINI_ANALYSIS_CHUNK_SIZE)
+            for attempt in range(GEMINI_ANALYSIS_MAX_ATTEMPTS):
+                chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+                outputs = await asyncio.gather(
+                    *(self.generate_gemini_analysis_chunk(screener_key, chunk) for chunk in chunks),
+                    return_exceptions=True
+                )
+                for chunk, output in zip(chunks, outputs):
+                    if isinstance(output, Exception):
+                        logger.error(f"Gemini analysis failed for {[p['ticker'] for p in chunk]}: {output}")
+                        continue
+                    results.update(output)
+
+                pending = [p for p in pending if p['ticker'] not in results]
+                if not pending:
+                    break
+                logger.warning(f"Gemini analysis missing for {len(pending)} symbols in {screener_key} "
+                               f"(attempt {attempt + 1}/{GEMINI_ANALYSIS_MAX_ATTEMPTS})")
+                chunk_size = max(1, chunk_size // 2)
 
-            prompt = f"""
+            return results
+
+        except Exception as e:
+            logger.error(f"Error generating batch Gemini analysis: {e}")
+            return {}
+
+    def build_gemini_analysis_prompt(self, screener_key: str, prompt_data: List[Dict]) -> str:
+        """銘柄解説のプロンプトを作成"""
+        # Definitions for the prompt
+        definitions_text = "\n".join([f"- {k}: {v}" for k, v in METRIC_DESCRIPTIONS.items()])
+
+        return f"""
 あなたはプロのテクニカル株式トレーダーです。以下の銘柄リスト（スクリーナー: {screener_key}）について、各銘柄の分析とトレーディング戦略を日本語で作成してください。
 
 【入力データ】
@@ -412,26 +456,51 @@ class AlgoScanner:
 2. スクリーナー指標（Momentum, RS Rating等）の強さを具体的な根拠として挙げること。
 3. 明確なエントリーポイント、利確目標（Take Profit）、損切りライン（Stop Loss）を含めた具体的なトレードシナリオを提案すること。
 4. 初心者にも分かりやすく、かつプロトレーダーの視点（需給、モメンタム）を取り入れた文章にすること。
-5. 出力は**必ず以下のJSON形式**のみとすること。Markdownのコードブロックなどは含めないこと。
+5. 入力データのすべての銘柄について解説を作成すること。
+6. 出力は**必ず以下のJSON形式**のみとすること。Markdownのコードブロックなどは含めないこと。
 {{
   "TICKER": "解説テキスト（400文字以内）",
   ...
 }}
 """
 
-            response_text = gemini_client.generate_content(prompt)
-
-            if not response_text:
-                return {}
-
-            # JSONパース（Markdownのバッククォートが含まれている場合の除去処理）
-            clean_text = response_text.replace('```json', '').replace('```', '').strip()
-            return json.loads(clean_text)
+    async def generate_gemini_analysis_chunk(self, screener_key: str, prompt_data: List[Dict]) -> Dict[str, str]:
+        """
+        1チャンク分の銘柄解説を生成して検証
 
-        except Exception as e:
-            logger.error(f"Error generating batch Gemini analysis: {e}")
+        Returns:
+            チャンク内の銘柄のうち、空でない解説が得られたもの（ticker -> 解説）
+        """
+        tickers = {p['ticker'].upper(): p['ticker'] for p in prompt_data}
+        cache_key = gemini_client.cache_key(
+            'screener_analysis', GEMINI_PROMPT_VERSIONS['screener_analysis'],
+            {'screener': screener_key, 'symbols': prompt_data, 'definitions': METRIC_DESCRIPTIONS}
+        )
+        response_text = await gemini_client.generate_content_async(
+            self.build_gemini_analysis_prompt(screener_key, prompt_data), cache_key=cache_key
+        )
+        if not response_text:
             return {}
 
+        # JSONパース（Markdownのバッククォートが含まれている場合の除去処理）
+        clean_text = response_text.replace('```json', '').replace('```', '').strip()
+        try:
+            parsed = json.loads(clean_text)
+        except json.JSONDecodeError:
+            parsed = None
+
+        results = {}
+        if isinstance(parsed, dict):
+            for key, text in parsed.items():
+                ticker = tickers.get(str(key).strip().upper())
+                if ticker and isinstance(text, str) and text.strip():
+                    results[ticker] = text.strip()
+
+        if len(results) < len(tickers):
+            # 一部でも欠けた応答はキャッシュから外し、次回は再生成する
+            gemini_client.cache.delete(cache_key)
+        return results
+
 # グローバルインスタンス
 algo_scanner = AlgoScanner()
 
@@ -445,7 +514,7 @@ async def analyze_single_ticker_algo(ticker: str) -> Optional[Dict]:
     if result:
          db = None
          try:
-             db = IBDDatabase()
+             db = IBDDatabase(read_only=True)
              profile = db.get_company_profile(ticker)
              if profile:
                  result['sector'] = profile.get('sector')
@@ -815,11 +815,15 @@ class MarketDataFetcher:
         return heatmaps
 
     # --- AI Generation ---
-    def _call_gemini_api(self, prompt, max_tokens=None):
-        """A generalized method to call the Gemini API."""
+    def _call_gemini_api(self, prompt, max_tokens=None, cache_template=None):
+        """
+        A generalized method to call the Gemini API.
+        With cache_template, an identical prompt reuses the cached response instead of calling the API again.
+        """
+        cache_key = gemini_client.cache_key(cache_template, 1, {'prompt': prompt}) if cache_template else None
         try:
             logger.info(f"Calling Gemini API...")
-            content = gemini_client.generate_content(prompt)
+            content = gemini_client.generate_content(prompt, cache_key=cache_key)
 
             if not content:
                 logger.error("Empty content in Gemini API response")
@@ -838,6 +842,8 @@ class MarketDataFetcher:
                 return json.loads(content)
             except json.JSONDecodeError as je:
                 logger.error(f"Failed to parse JSON response: {content[:500]}")
+                if cache_key:
+                    gemini_client.cache.delete(cache_key)
                 raise MarketDataError("E005", f"Invalid JSON response: {je}") from je
 
         except Exception as e:
@@ -1076,7 +1082,7 @@ class MarketDataFetcher:
 
         try:
             # Call Gemini
-            response_json = self._call_gemini_api(prompt)
+            response_json = self._call_gemini_api(prompt, cache_template='unified_report')
 
             # Distribute results
             self.data['market']['ai_commentary'] = response_json.get('market_commentary', '生成失敗')
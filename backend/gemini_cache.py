@@ -0,0 +1,140 @@
+"""
+Gemini response cache for HanaView
+入力が同じGemini生成結果をディスクに保存し、再実行時にAPIを呼ばずに返す
+"""
+
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import numbers
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの保存先と既定の有効期限（秒、0でキャッシュ無効）
+GEMINI_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", "data/gemini_cache")
+GEMINI_CACHE_TTL_SEC = float(os.getenv("GEMINI_CACHE_TTL_SEC", str(24 * 60 * 60)))
+
+
+def normalize_inputs(value: Any) -> Any:
+    """
+    キャッシュキー用に入力を正規化
+
+    floatは有効数字10桁に丸め、NaN/Infは None にする（表現の揺れでキーが変わらないように）。
+    numpyのスカラーなどJSONにできない値は文字列にする。
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize_inputs(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(v) for v in value]
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            return None
+        return float(f"{value:.10g}")
+    return str(value)
+
+
+class GeminiResponseCache:
+    def __init__(self, cache_dir: str = GEMINI_CACHE_DIR, default_ttl_sec: float = GEMINI_CACHE_TTL_SEC):
+        self.cache_dir = cache_dir
+        self.default_ttl_sec = default_ttl_sec
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir) and self.default_ttl_sec > 0
+
+    @staticmethod
+    def make_key(model: str, template: str, version: Any, inputs: Any) -> str:
+        """
+        モデル名・プロンプトテンプレート名とバージョン・正規化した入力からキーを作成
+
+        プロンプトの文面を変更した場合はテンプレートのバージョンを上げること。
+        """
+        payload = json.dumps(
+            {'model': model, 'template': template, 'version': version, 'inputs': normalize_inputs(inputs)},
+            ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュされた生成結果（ない・期限切れの場合はNone）"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Invalid Gemini cache entry {path}: {e}")
+            self.delete(key)
+            return None
+
+        if entry.get('expires_at', 0) < time.time():
+            self.delete(key)
+            return None
+        return entry.get('text')
+
+    def set(self, key: str, text: str, ttl_sec: Optional[float] = None, meta: Optional[Dict] = None) -> bool:
+        """生成結果を保存（一時ファイルに書いてから置き換える）"""
+        ttl_sec = self.default_ttl_sec if ttl_sec is None else ttl_sec
+        if not self.enabled or ttl_sec <= 0:
+            return False
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            now = time.time()
+            entry = {'created_at': now, 'expires_at': now + ttl_sec, 'text': text, **(meta or {})}
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to write Gemini cache entry {path}: {e}")
+            return False
+
+    def delete(self, key: str):
+        """キャッシュを削除（生成結果が使えなかった場合など）"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to delete Gemini cache entry {key}: {e}")
+
+    def purge_expired(self) -> int:
+        """期限切れのキャッシュを削除し、削除件数を返す"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        removed = 0
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        expired = json.load(f).get('expires_at', 0) < now
+                except Exception:
+                    expired = True
+                if expired:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
@@ -4,22 +4,79 @@ google-genai ライブラリを使用した統一クライアント
 """
 
 import os
+import time
+import random
+import asyncio
 import logging
-from typing import Optional
+import weakref
+from types import SimpleNamespace
+from typing import Any, Callable, List, Optional
 from google import genai
+from google.genai import errors, types
+
+from .gemini_cache import GeminiResponseCache
 
 logger = logging.getLogger(__name__)
 
+# 同時に実行するGemini API呼び出しの上限
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# 1回の呼び出しの制限時間（秒）
+GEMINI_TIMEOUT_SEC = float(os.getenv("GEMINI_TIMEOUT_SEC", "120"))
+# リトライ間隔（指数バックオフの初期値と上限、秒）
+GEMINI_BACKOFF_BASE_SEC = 2.0
+GEMINI_BACKOFF_MAX_SEC = 60.0
+
+
+class FakeGeminiClient:
+    """
+    テスト・ローカル実行用のGeminiクライアント（APIを呼ばない）
+
+    genai.Client と同じ models.generate_content / aio.models.generate_content を持ち、
+    responder(prompt) の戻り値を生成結果として返す。呼び出されたプロンプトは prompts に記録する。
+    """
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None):
+        self.responder = responder or (lambda prompt: '{}')
+        self.prompts: List[str] = []
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_async))
+
+    def _generate(self, model: str, contents: Any):
+        self.prompts.append(contents)
+        return SimpleNamespace(text=self.responder(contents))
+
+    async def _generate_async(self, model: str, contents: Any):
+        return self._generate(model, contents)
+
+
 class GeminiClient:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = GEMINI_MAX_CONCURRENCY, timeout_sec: float = GEMINI_TIMEOUT_SEC,
+                 client=None, cache: Optional[GeminiResponseCache] = None):
+        """
+        Args:
+            max_concurrency: 非同期呼び出しの同時実行数
+            timeout_sec: 1回の呼び出しの制限時間（秒）
+            client: genai.Client の代わりに使うクライアント（FakeGeminiClient など）
+            cache: 生成結果のキャッシュ（省略時は GEMINI_CACHE_DIR）
+        """
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        self.max_concurrency = max_concurrency
+        self.timeout_sec = timeout_sec
+        self.cache = cache or GeminiResponseCache()
+        # asyncio.Semaphore はイベントループごとに作成する
+        self._semaphores = weakref.WeakKeyDictionary()
+        if client is not None:
+            self.client = client
+        elif not self.api_key:
             # Don't raise error on init, just log warning.
             # This allows app to start even without API key (features will be disabled)
             logger.warning("GEMINI_API_KEY environment variable is not set")
             self.client = None
         else:
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(timeout=int(self.timeout_sec * 1000))
+            )
 
         self.model = 'gemini-2.0-flash-exp' # Using 2.0 Flash as per latest info/spec recommendation if available, or fallback to what spec said.
         # Spec said 'gemini-3-flash-preview' but that might be a typo in spec or future model.
@@ -30,17 +87,106 @@ class GeminiClient:
         # Wait, the spec explicitly said "gemini-3-flash-preview". I will use that.
         self.model = 'gemini-3-flash-preview'
 
-    def generate_content(self, prompt: str, max_retries: int = 3) -> Optional[str]:
+    def cache_key(self, template: str, version: Any, inputs: Any) -> str:
+        """現在のモデル・プロンプトテンプレート・入力から生成結果のキャッシュキーを作成"""
+        return self.cache.make_key(self.model, template, version, inputs)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """レート制限・サーバーエラー・タイムアウトはリトライ、それ以外の4xxはリトライしない"""
+        if isinstance(error, errors.ClientError):
+            return error.code in (408, 429)
+        return True
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """指数バックオフ（フルジッター）"""
+        return random.uniform(0, min(GEMINI_BACKOFF_MAX_SEC, GEMINI_BACKOFF_BASE_SEC * (2 ** attempt)))
+
+    async def generate_content_async(self, prompt: str, max_retries: int = 3, timeout: Optional[float] = None,
+                                     cache_key: Optional[str] = None,
+                                     cache_ttl: Optional[float] = None) -> Optional[str]:
         """
-        Gemini APIでコンテンツを生成
+        Gemini APIでコンテンツを生成（非同期）
+
+        同時実行数をセマフォで制限し、失敗時は指数バックオフ（ジッター付き）でリトライする。
+        呼び出し元のタスクがキャンセルされた場合は、待機中・実行中のリクエストも中断する。
 
         Args:
             prompt: プロンプトテキスト
-            max_retries: リトライ回数
+            max_retries: 最大試行回数
+            timeout: 1回の呼び出しの制限時間（秒、省略時は GEMINI_TIMEOUT_SEC）
+            cache_key: 指定するとキャッシュ済みの結果を返し、新しい結果を保存する（cache_key() で作成）
+            cache_ttl: キャッシュの有効期限（秒、省略時は GEMINI_CACHE_TTL_SEC）
 
         Returns:
             生成されたテキスト、失敗時はNone
         """
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Gemini cache hit: {cache_key[:12]}")
+                return cached
+
+        if not self.client:
+            logger.error("Gemini Client not initialized (missing API key)")
+            return None
+
+        timeout = timeout or self.timeout_sec
+        for attempt in range(max_retries):
+            try:
+                async with self._semaphore():
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(model=self.model, contents=prompt),
+                        timeout=timeout
+                    )
+
+                if response.text:
+                    if cache_key:
+                        self.cache.set(cache_key, response.text, cache_ttl, {'model': self.model})
+                    return response.text
+                logger.warning(f"Empty response from Gemini API (attempt {attempt + 1}/{max_retries})")
+
+            except asyncio.TimeoutError:
+                logger.error(f"Gemini API timed out after {timeout}s (attempt {attempt + 1}/{max_retries})")
+            except Exception as e:
+                logger.error(f"Gemini API error (attempt {attempt + 1}/{max_retries}): {e}")
+                if not self._is_retryable(e):
+                    return None
+
+            if attempt < max_retries - 1:
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        logger.error("All Gemini API attempts failed")
+        return None
+
+    def generate_content(self, prompt: str, max_retries: int = 3, cache_key: Optional[str] = None,
+                         cache_ttl: Optional[float] = None) -> Optional[str]:
+        """
+        Gemini APIでコンテンツを生成（同期。イベントループ外のバッチ処理用）
+
+        Args:
+            prompt: プロンプトテキスト
+            max_retries: 最大試行回数
+            cache_key, cache_ttl: generate_content_async と同じ
+
+        Returns:
+            生成されたテキスト、失敗時はNone
+        """
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Gemini cache hit: {cache_key[:12]}")
+                return cached
+
         if not self.client:
             logger.error("Gemini Client not initialized (missing API key)")
             return None
@@ -53,16 +199,20 @@ class GeminiClient:
                 )
 
                 if response.text:
+                    if cache_key:
+                        self.cache.set(cache_key, response.text, cache_ttl, {'model': self.model})
                     return response.text
-                else:
-                    logger.warning(f"Empty response from Gemini API (attempt {attempt + 1}/{max_retries})")
+                logger.warning(f"Empty response from Gemini API (attempt {attempt + 1}/{max_retries})")
 
             except Exception as e:
                 logger.error(f"Gemini API error (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    logger.error("All Gemini API attempts failed")
+                if not self._is_retryable(e):
                     return None
 
+            if attempt < max_retries - 1:
+                time.sleep(self._backoff_delay(attempt))
+
+        logger.error("All Gemini API attempts failed")
         return None
 
 # グローバルインスタンス
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""IBDデータベース管理CLI実行用スクリプト"""
+
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from .market_algo_x.ibd_data_collector import IBDDataCollector
+from .market_algo_x.ibd_database import IBDDatabase
+
+DB_PATH = 'data/ibd_data.db'
+
+USAGE = """Usage: python -m backend.ibd_cli <command> [options]
+
+Commands:
+  eod [YYYY-MM-DD]   不足している日足だけを全銘柄まとめて追記（日次更新）
+  universe           ティッカー一覧と比較し、新規銘柄のみデータを収集
+  migrate-price-history
+                     旧形式のprice_historyを WITHOUT ROWID 形式に変換
+  archive [SESSIONS] [--vacuum]
+                     直近SESSIONS営業日（デフォルト320）より古い日足を年別アーカイブDBへ移動
+"""
+
+
+def run_eod(args):
+    """EOD一括更新を実行"""
+    trade_date = args[0] if args else None
+    collector = IBDDataCollector(os.getenv('FMP_API_KEY'))
+    try:
+        collector.run_eod_update(trade_date=trade_date)
+    finally:
+        collector.close()
+    return 0
+
+
+def run_universe(args):
+    """新規銘柄のオンボーディングを実行"""
+    collector = IBDDataCollector(os.getenv('FMP_API_KEY'))
+    try:
+        summary = collector.onboard_new_tickers()
+    finally:
+        collector.close()
+    if summary['removed']:
+        print(f"一覧から除外された銘柄: {', '.join(summary['removed'][:50])}")
+    return 0
+
+
+def run_migrate_price_history(args):
+    """price_historyのスキーマ変換を実行"""
+    db = IBDDatabase(DB_PATH, silent=True)
+    try:
+        db.migrate_price_history()
+    finally:
+        db.close()
+    return 0
+
+
+def run_archive(args):
+    """古い日足のアーカイブを実行"""
+    vacuum = '--vacuum' in args
+    positional = [a for a in args if not a.startswith('--')]
+    keep_sessions = int(positional[0]) if positional else None
+    db = IBDDatabase(DB_PATH, silent=True)
+    try:
+        db.archive_price_history(keep_sessions=keep_sessions, vacuum=vacuum)
+    finally:
+        db.close()
+    return 0
+
+
+COMMANDS = {
+    'eod': run_eod,
+    'universe': run_universe,
+    'migrate-price-history': run_migrate_price_history,
+    'archive': run_archive,
+}
+
+
+def main(argv):
+    """メイン実行関数"""
+    if len(argv) < 1 or argv[0] not in COMMANDS:
+        print(USAGE)
+        return 1
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    sys.exit(main(sys.argv[1:]))
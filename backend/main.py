@@ -22,6 +22,8 @@ from .hwb_scanner import run_hwb_scan, analyze_single_ticker
 # Algoスキャン関連のインポート
 from .algo_scanner import run_algo_scan, analyze_single_ticker_algo
 from .algo_data_manager import AlgoDataManager
+from .market_algo_x.ibd_feature_snapshot import feature_snapshot, parse_screen_params
+from .market_algo_x.ibd_database import DatabaseNotFoundError
 import asyncio
 
 # Setup logging
@@ -531,6 +533,30 @@ def get_algo_latest_summary(payload: dict = Depends(get_current_user_payload)):
         raise HTTPException(status_code=500, detail="Could not retrieve Algo summary")
 
 
+@app.get("/api/algo/screen")
+def screen_algo_universe(request: Request, payload: dict = Depends(get_current_user_payload)):
+    """
+    IBDデータベースに対するアドホックスクリーニング（ura権限のみ）
+
+    例: /api/algo/screen?rs_rating_min=90&comp_rating_min=80&ad_rating=A,B&sort=rs_rating&limit=50
+    """
+    if payload.get("permission") != "ura":
+        raise HTTPException(status_code=403, detail="Access forbidden: ura permission required")
+
+    try:
+        query = parse_screen_params(dict(request.query_params))
+        return feature_snapshot.screen(**query)
+
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e).strip("'"))
+    except DatabaseNotFoundError as e:
+        logger.warning(f"Algo screen unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Screening data is not available yet")
+    except Exception as e:
+        logger.error(f"Algo screen error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not run screen")
+
+
 @app.get("/api/algo/symbols/{symbol}")
 def get_algo_symbol_data(symbol: str, payload: dict = Depends(get_current_user_payload)):
     """個別銘柄データ取得（ura権限のみ）"""
@@ -7,12 +7,19 @@ yfinanceの代わりにFMP Stock Screener APIを使用することで：
 - 処理時間を数分〜十数分から数秒に短縮
 - より正確な銘柄分類
 
+取得したティッカー一覧は data/ticker_universe.json にキャッシュされ、
+TTL（既定7日。日次の収集より十分長くする）内は再取得しません。TTL切れの場合はキャッシュを返しつつ
+バックグラウンドで再取得し、追加・上場廃止銘柄の差分を記録します。
+
 環境変数 FMP_API_KEY が必要です。
 """
 
 import os
+import json
+import threading
 import pandas as pd
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
 import time
 from curl_cffi.requests import Session
 from dotenv import load_dotenv
@@ -25,14 +32,18 @@ class FMPTickerFetcher:
     """FMP Stock Screener API を使用してティッカーを取得"""
 
     BASE_URL = "https://financialmodelingprep.com/api/v3/stock-screener"
+    DEFAULT_CACHE_PATH = 'data/ticker_universe.json'
 
-    def __init__(self, api_key: str = None, rate_limit: int = None):
+    def __init__(self, api_key: str = None, rate_limit: int = None,
+                 cache_path: str = None, cache_ttl_hours: float = None):
         """
         FMP Ticker Fetcherの初期化
 
         Args:
             api_key: FMP API Key（環境変数 FMP_API_KEY から自動取得可能）
             rate_limit: 1分あたりのAPIレート制限（環境変数 FMP_RATE_LIMIT から自動取得可能）
+            cache_path: ティッカー一覧のキャッシュファイル（環境変数 FMP_TICKER_CACHE から自動取得可能）
+            cache_ttl_hours: キャッシュの有効期間（環境変数 FMP_TICKER_CACHE_TTL_HOURS、デフォルト168時間=7日）
         """
         self.api_key = api_key or os.getenv('FMP_API_KEY')
 
@@ -46,6 +57,15 @@ class FMPTickerFetcher:
         self.session = Session(impersonate="chrome110")
         self.request_timestamps = []
 
+        # ティッカー一覧のキャッシュ設定
+        # （TTLを日次cronの間隔より長くし、毎回の収集で一覧の再取得が走らないようにする）
+        self.cache_path = cache_path or os.getenv('FMP_TICKER_CACHE', self.DEFAULT_CACHE_PATH)
+        self.cache_ttl = timedelta(hours=cache_ttl_hours if cache_ttl_hours is not None
+                                   else float(os.getenv('FMP_TICKER_CACHE_TTL_HOURS', '168')))
+        self.refresh_thread: Optional[threading.Thread] = None
+        # 直近の再取得で検出した差分 {'added': [...], 'removed': [...]}
+        self.last_diff: Optional[Dict[str, List[str]]] = None
+
     def _enforce_rate_limit(self):
         """設定されたAPIレート制限を適用"""
         current_time = time.time()
@@ -126,9 +146,56 @@ class FMPTickerFetcher:
 
         return stocks
 
-    def get_all_stocks(self, exchanges: List[str] = None) -> pd.DataFrame:
+    def get_all_stocks(self, exchanges: List[str] = None, use_cache: bool = True,
+                       background: bool = True) -> pd.DataFrame:
+        """
+        指定された取引所から全ての個別銘柄を取得（キャッシュ対応）
+
+        - キャッシュがTTL内: キャッシュをそのまま返す
+        - キャッシュがTTL切れ: キャッシュを返し、バックグラウンドで再取得して差分を記録
+          （background=False の場合はその場で再取得し、新しい一覧を返す）
+        - キャッシュなし / use_cache=False: APIから取得してキャッシュに保存
+
+        Args:
+            exchanges: 取引所のリスト（デフォルト: ['nasdaq', 'nyse', 'amex']）
+            use_cache: キャッシュを使用するか
+            background: TTL切れ時にバックグラウンドで再取得するか
+                        （Trueの場合、プロセス終了前に wait_for_refresh() で完了を待つこと）
+
+        Returns:
+            銘柄情報を含むDataFrame
+        """
+        if exchanges is None:
+            exchanges = ['nasdaq', 'nyse', 'amex']
+
+        cache = self._load_cache(exchanges) if use_cache else None
+        if cache is None:
+            df = self.fetch_all_stocks(exchanges)
+            self._save_cache(exchanges, df, previous=self._load_cache(exchanges))
+            return df
+
+        if datetime.now() - cache['fetched_at'] >= self.cache_ttl:
+            if not background:
+                return self._refresh(exchanges, cache)
+            self._start_background_refresh(exchanges)
+
+        return cache['stocks']
+
+    def get_cached_stocks(self, exchanges: List[str] = None) -> pd.DataFrame:
+        """
+        キャッシュ済みのティッカー一覧を返す（TTLに関係なく、APIからは再取得しない）
+
+        Returns:
+            銘柄情報を含むDataFrame（キャッシュがない場合は空）
         """
-        指定された取引所から全ての個別銘柄を取得
+        if exchanges is None:
+            exchanges = ['nasdaq', 'nyse', 'amex']
+        cache = self._load_cache(exchanges)
+        return cache['stocks'] if cache is not None else pd.DataFrame()
+
+    def fetch_all_stocks(self, exchanges: List[str] = None) -> pd.DataFrame:
+        """
+        指定された取引所から全ての個別銘柄をAPIから取得（キャッシュを使用しない）
 
         Args:
             exchanges: 取引所のリスト（デフォルト: ['nasdaq', 'nyse', 'amex']）
@@ -169,6 +236,96 @@ class FMPTickerFetcher:
 
         return df
 
+    # ==================== キャッシュ ====================
+
+    def _load_cache(self, exchanges: List[str]) -> Optional[Dict]:
+        """キャッシュを読み込む（取引所の組み合わせが異なる場合はNone）"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if sorted(data.get('exchanges', [])) != sorted(e.lower() for e in exchanges):
+                return None
+            return {
+                'fetched_at': datetime.fromisoformat(data['fetched_at']),
+                'stocks': pd.DataFrame(data['stocks']),
+                'diff': data.get('diff')
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_cache(self, exchanges: List[str], df: pd.DataFrame, previous: Optional[Dict] = None):
+        """
+        取得結果をキャッシュに保存し、前回キャッシュとの差分を記録
+
+        APIキー未設定時のフォールバック結果や空の結果は保存しない。
+
+        Returns:
+            bool: 保存したか
+        """
+        if df is None or df.empty or not self.api_key or self.api_key == "your_fmp_api_key_here":
+            return False
+
+        diff = None
+        if previous is not None and not previous['stocks'].empty:
+            old_tickers = set(previous['stocks']['Ticker'])
+            new_tickers = set(df['Ticker'])
+            if len(new_tickers) < len(old_tickers) * 0.5:
+                # 一部の取引所の取得失敗とみられるため、キャッシュを更新しない
+                print(f"Ticker universe shrank from {len(old_tickers)} to {len(new_tickers)}; keeping previous cache")
+                return False
+            diff = {
+                'added': sorted(new_tickers - old_tickers),
+                'removed': sorted(old_tickers - new_tickers)
+            }
+            self.last_diff = diff
+            print(f"ティッカー一覧の差分: 追加 {len(diff['added'])} 銘柄, 除外 {len(diff['removed'])} 銘柄")
+
+        data = {
+            'fetched_at': datetime.now().isoformat(),
+            'exchanges': sorted(e.lower() for e in exchanges),
+            'stocks': df.astype(object).where(df.notna(), None).to_dict(orient='records'),
+            'diff': diff
+        }
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        return True
+
+    def _refresh(self, exchanges: List[str], previous: Optional[Dict]) -> pd.DataFrame:
+        """
+        APIから再取得してキャッシュを更新し、差分を記録
+
+        保存できなかった場合（取得失敗・一覧の大幅な縮小）は前回キャッシュの一覧を返す。
+        """
+        df = self.fetch_all_stocks(exchanges)
+        if self._save_cache(exchanges, df, previous=previous) or previous is None:
+            return df
+        return previous['stocks']
+
+    def _start_background_refresh(self, exchanges: List[str]):
+        """TTL切れのキャッシュをバックグラウンドで再取得"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return
+
+        def refresh():
+            try:
+                self._refresh(exchanges, self._load_cache(exchanges))
+            except Exception as e:
+                print(f"Background ticker refresh failed: {e}")
+
+        self.refresh_thread = threading.Thread(target=refresh, name='ticker-universe-refresh', daemon=True)
+        self.refresh_thread.start()
+
+    def wait_for_refresh(self, timeout: float = None) -> Optional[Dict[str, List[str]]]:
+        """バックグラウンド再取得の完了を待ち、検出した差分を返す"""
+        if self.refresh_thread is not None:
+            self.refresh_thread.join(timeout)
+        return self.last_diff
+
     def _get_sp500_fallback(self) -> pd.DataFrame:
         """Fetch S&P 500 tickers from Wikipedia as a fallback"""
         try:
@@ -6,22 +6,137 @@ SQLiteデータベースを使用して、株価、EPS、その他の財務デ
 
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 
+import numpy as np
 import pandas as pd
 
 
+def _records_from_df(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """DataFrameをexecutemany用のタプルのリストに変換（NaNはNULLに変換）"""
+    values = df.reindex(columns=columns).astype(object)
+    values = values.where(values.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+PRICE_HISTORY_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        ticker TEXT NOT NULL,
+        date TEXT NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume INTEGER,
+        PRIMARY KEY (ticker, date),
+        FOREIGN KEY (ticker) REFERENCES tickers(ticker)
+    ) WITHOUT ROWID
+'''
+
+# 年別アーカイブDB（ibd_archive/price_history_YYYY.db）のテーブル
+PRICE_ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        ticker TEXT NOT NULL,
+        date TEXT NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume INTEGER,
+        PRIMARY KEY (ticker, date)
+    ) WITHOUT ROWID
+'''
+
+
+class _ReadOnlyConnectionPool:
+    """
+    読み取り専用接続のプール
+
+    スキーマ初期化を行わない mode=ro 接続を使い回し、API・スクリーナーからの
+    読み取りを夜間の書き込みと並行して実行できるようにする。
+    """
+
+    MAX_IDLE_PER_PATH = 8
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[sqlite3.Connection]] = {}
+
+    def acquire(self, db_path: str, cache_size_kb: int) -> sqlite3.Connection:
+        key = os.path.abspath(db_path)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+
+        conn = sqlite3.connect(f'file:{key}?mode=ro', uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # 書き込み側がWALで更新するため immutable=1 は使わず、読み取り専用と大きめのキャッシュのみ設定
+        conn.execute('PRAGMA query_only=ON')
+        conn.execute(f'PRAGMA cache_size=-{int(cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={self.MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def release(self, db_path: str, conn: sqlite3.Connection):
+        key = os.path.abspath(db_path)
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.MAX_IDLE_PER_PATH:
+                idle.append(conn)
+                return
+        conn.close()
+
+
+_read_only_pool = _ReadOnlyConnectionPool()
+
+
+class DatabaseNotFoundError(FileNotFoundError):
+    """読み取り専用で開くデータベースファイルが存在しない（データ収集が未実行）"""
+
+
 class IBDDatabase:
     """IBD スクリーナー用のSQLiteデータベース管理クラス"""
 
-    def __init__(self, db_path='data/ibd_data.db', silent=False):
+    # ページキャッシュサイズ（KiB）
+    CACHE_SIZE_KB = 64 * 1024
+    # 他の接続が書き込み中の場合に待機する秒数
+    BUSY_TIMEOUT_SEC = 60
+    # price_history（ホット層）に残す営業日数（RS 252日・52週指標 260日 + 余裕分）
+    PRICE_HOT_SESSIONS = 320
+
+    # このプロセスでスキーマ初期化済みのDBパス
+    _schema_initialized = set()
+    _schema_lock = threading.Lock()
+
+    def __init__(self, db_path='data/ibd_data.db', silent=False, read_only=False, archive_dir=None):
         """
         Args:
             db_path: データベースファイルのパス
+            silent: 初期化メッセージを表示しない
+            read_only: 読み取り専用で開く（スキーマ初期化を行わず、接続プールから取得）
+            archive_dir: 年別アーカイブDBの保存先（デフォルトはDBと同じディレクトリの ibd_archive）
+
+        Raises:
+            DatabaseNotFoundError: read_only でDBファイルが存在しない場合
         """
         self.db_path = db_path
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(db_path), 'ibd_archive')
         self.conn = None
-        self.initialize_database(silent)
+        self.read_only = read_only
+        self._in_transaction = False
+        if read_only:
+            # mode=ro では新規作成できず sqlite3.OperationalError になるため、先に確認する
+            if not os.path.exists(self.db_path):
+                raise DatabaseNotFoundError(f"IBDデータベースがありません（データ収集が未実行）: {self.db_path}")
+            self.conn = _read_only_pool.acquire(self.db_path, self.CACHE_SIZE_KB)
+        else:
+            self.initialize_database(silent)
 
     def initialize_database(self, silent=False):
         """データベースの初期化とテーブル作成"""
@@ -30,8 +145,22 @@ class IBDDatabase:
         if db_dir:
             os.makedirs(db_dir, exist_ok=True)
 
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        schema_key = os.path.abspath(self.db_path)
+        db_exists = os.path.exists(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.BUSY_TIMEOUT_SEC)
         self.conn.row_factory = sqlite3.Row
+        self._configure_connection()
+
+        # 同一プロセス内で初期化済みのDBはCREATE文をスキップ（ワーカーごとの接続用）
+        if db_exists and schema_key in IBDDatabase._schema_initialized:
+            return
+
+        with IBDDatabase._schema_lock:
+            self._create_tables(silent)
+            IBDDatabase._schema_initialized.add(schema_key)
+
+    def _create_tables(self, silent=False):
+        """テーブルとインデックスを作成"""
         cursor = self.conn.cursor()
 
         # 1. 銘柄マスターテーブル
@@ -48,21 +177,14 @@ class IBDDatabase:
         ''')
 
         # 2. 株価履歴テーブル
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS price_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticker TEXT NOT NULL,
-                date DATE NOT NULL,
-                open REAL,
-                high REAL,
-                low REAL,
-                close REAL,
-                volume INTEGER,
-                UNIQUE(ticker, date),
-                FOREIGN KEY (ticker) REFERENCES tickers(ticker)
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_ticker_date ON price_history(ticker, date)')
+        # (ticker, date) をクラスタ化主キーとする WITHOUT ROWID テーブル
+        # 旧形式（id + UNIQUE + 別インデックス）のDBは migrate_price_history() で変換する
+        if self._is_legacy_price_history():
+            if not silent:
+                print("警告: price_historyが旧形式です。"
+                      "python -m backend.ibd_cli migrate-price-history で変換してください")
+        else:
+            cursor.execute(PRICE_HISTORY_SCHEMA.format(table='price_history'))
 
         # 3. 四半期損益計算書テーブル
         cursor.execute('''
@@ -218,14 +340,144 @@ class IBDDatabase:
             )
         ''')
 
+        # 12. 最新指標テーブル（株価取り込み後に refresh_latest_metrics() で更新）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS latest_metrics (
+                ticker TEXT PRIMARY KEY,
+                as_of_date TEXT,
+                history_days INTEGER,
+                price REAL,
+                pct_change_1d REAL,
+                change_from_open REAL,
+                pct_1w REAL,
+                pct_1m REAL,
+                pct_3m REAL,
+                pct_6m REAL,
+                ma_10 REAL,
+                ma_21 REAL,
+                ma_50 REAL,
+                ma_150 REAL,
+                ma_200 REAL,
+                high_52w REAL,
+                low_52w REAL,
+                avg_vol_50 REAL,
+                avg_vol_90 REAL,
+                current_volume REAL,
+                vol_change_pct REAL,
+                rel_volume REAL,
+                up_volume_50 REAL,
+                down_volume_50 REAL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+        ''')
+
+        # 13. データ収集ジョブの実行ジャーナル（中断時の再開用）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collection_runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL DEFAULT 'running',
+                use_full_dataset INTEGER,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collection_run_steps (
+                run_id INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (run_id, step),
+                FOREIGN KEY (run_id) REFERENCES collection_runs(run_id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collection_run_tickers (
+                run_id INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (run_id, ticker),
+                FOREIGN KEY (run_id) REFERENCES collection_runs(run_id)
+            )
+        ''')
+
+        # 14. 日次スナップショット（前日からの変化を取得するため）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ratings_snapshots (
+                date TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                rs_rating INTEGER,
+                eps_rating INTEGER,
+                ad_rating TEXT,
+                smr_rating TEXT,
+                comp_rating INTEGER,
+                industry_group_rs INTEGER,
+                price_vs_52w_high REAL,
+                PRIMARY KEY (date, ticker)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS screener_snapshots (
+                date TEXT NOT NULL,
+                screener TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                PRIMARY KEY (date, screener, ticker)
+            ) WITHOUT ROWID
+        ''')
+
         self.conn.commit()
         if not silent:
             print(f"データベースを初期化しました: {self.db_path}")
 
+    def _configure_connection(self):
+        """
+        書き込み性能向けのPRAGMAを設定
+
+        - WAL: 書き込み中も他の接続から読み取り可能、コミットごとのfsyncを削減
+        - synchronous=NORMAL: WALではチェックポイント時のみfsync（電源断時も破損はしない）
+        - cache_size: ページキャッシュを拡大
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA cache_size=-{int(self.CACHE_SIZE_KB)}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+
     def close(self):
-        """データベース接続を閉じる"""
+        """データベース接続を閉じる（読み取り専用接続はプールに返却）"""
         if self.conn:
-            self.conn.close()
+            if self.read_only:
+                _read_only_pool.release(self.db_path, self.conn)
+            else:
+                self.conn.close()
+            self.conn = None
+
+    @contextmanager
+    def transaction(self):
+        """
+        複数の書き込みを1トランザクションにまとめる
+
+        ブロック内の commit() は実行されず、ブロック終了時に一括でコミットする。
+        例外発生時はロールバックする。
+        """
+        if self._in_transaction:
+            yield self
+            return
+
+        self._in_transaction = True
+        try:
+            yield self
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+
+    def commit(self):
+        """トランザクションブロック外の場合のみコミット"""
+        if not self._in_transaction:
+            self.conn.commit()
 
     # ==================== ティッカーマスター ====================
 
@@ -236,7 +488,7 @@ class IBDDatabase:
             INSERT OR REPLACE INTO tickers (ticker, exchange, name)
             VALUES (?, ?, ?)
         ''', (ticker, exchange, name))
-        self.conn.commit()
+        self.commit()
 
     def insert_tickers_bulk(self, tickers_data: List[Dict]):
         """ティッカーを一括追加"""
@@ -245,7 +497,7 @@ class IBDDatabase:
             INSERT OR REPLACE INTO tickers (ticker, exchange, name)
             VALUES (:ticker, :exchange, :name)
         ''', tickers_data)
-        self.conn.commit()
+        self.commit()
 
     def get_all_tickers(self) -> List[str]:
         """全ティッカーを取得"""
@@ -260,25 +512,41 @@ class IBDDatabase:
         if prices_df is None or len(prices_df) == 0:
             return
 
-        # DataFrameをSQLiteに挿入
-        records = []
-        for _, row in prices_df.iterrows():
-            records.append({
-                'ticker': ticker,
-                'date': row['date'].strftime('%Y-%m-%d') if isinstance(row['date'], pd.Timestamp) else row['date'],
-                'open': row.get('open'),
-                'high': row.get('high'),
-                'low': row.get('low'),
-                'close': row.get('close'),
-                'volume': row.get('volume')
-            })
+        self.insert_price_history_bulk(prices_df.assign(ticker=ticker))
+
+    def insert_price_history_bulk(self, prices_df: pd.DataFrame) -> int:
+        """
+        複数銘柄の株価履歴を1トランザクションで一括挿入
+
+        Args:
+            prices_df: ticker, date, open, high, low, close, volume 列を持つDataFrame
+
+        Returns:
+            int: 挿入した行数
+        """
+        if prices_df is None or len(prices_df) == 0:
+            return 0
+
+        columns = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']
+        df = prices_df.reindex(columns=columns)
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        df['volume'] = pd.to_numeric(df['volume'], errors='coerce').round().astype('Int64')
+        df = df.dropna(subset=['ticker', 'date'])
+        records = _records_from_df(df, columns)
 
         cursor = self.conn.cursor()
         cursor.executemany('''
             INSERT OR REPLACE INTO price_history (ticker, date, open, high, low, close, volume)
-            VALUES (:ticker, :date, :open, :high, :low, :close, :volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', records)
-        self.conn.commit()
+        self.commit()
+        return len(records)
+
+    def get_latest_price_dates(self) -> Dict[str, str]:
+        """銘柄ごとの最新の価格データの日付を取得"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT ticker, MAX(date) FROM price_history GROUP BY ticker')
+        return {row[0]: row[1] for row in cursor.fetchall()}
 
     def get_price_history(self, ticker: str, days: int = 300) -> Optional[pd.DataFrame]:
         """株価履歴を取得"""
@@ -297,6 +565,32 @@ class IBDDatabase:
             return df
         return None
 
+    def get_recent_price_rows(self, days: int = 300, columns: tuple = ('close',)) -> pd.DataFrame:
+        """
+        全銘柄の直近N営業日分の株価を1回のスキャンで取得
+
+        Args:
+            days: 銘柄ごとに取得する最大行数
+            columns: 取得する価格列（open, high, low, close, volume）
+
+        Returns:
+            DataFrame: ticker, pos（1=最新）, date と指定列を持つロング形式
+        """
+        allowed = {'open', 'high', 'low', 'close', 'volume'}
+        columns = [c for c in columns if c in allowed]
+        select_cols = ''.join(f', {c}' for c in columns)
+        query = f'''
+            SELECT ticker, pos, date{select_cols}
+            FROM (
+                SELECT ticker, date{select_cols},
+                       ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS pos
+                FROM price_history
+            )
+            WHERE pos <= ?
+            ORDER BY ticker, pos
+        '''
+        return pd.read_sql_query(query, self.conn, params=(days,))
+
     def get_latest_price_date(self) -> Optional[str]:
         """最新の価格データの日付を取得"""
         query = '''
@@ -346,7 +640,7 @@ class IBDDatabase:
             (ticker, date, fiscal_year, fiscal_quarter, revenue, net_income, eps, eps_diluted)
             VALUES (:ticker, :date, :fiscal_year, :fiscal_quarter, :revenue, :net_income, :eps, :eps_diluted)
         ''', records)
-        self.conn.commit()
+        self.commit()
 
     def insert_income_statements_annual(self, ticker: str, statements: List[Dict]):
         """年次損益計算書を挿入"""
@@ -371,7 +665,7 @@ class IBDDatabase:
             (ticker, date, fiscal_year, revenue, net_income, eps, eps_diluted)
             VALUES (:ticker, :date, :fiscal_year, :revenue, :net_income, :eps, :eps_diluted)
         ''', records)
-        self.conn.commit()
+        self.commit()
 
     def get_income_statements_quarterly(self, ticker: str, limit: int = 8) -> List[Dict]:
         """四半期損益計算書を取得"""
@@ -403,6 +697,22 @@ class IBDDatabase:
 
         return [dict(row) for row in rows]
 
+    def get_all_income_statements_quarterly(self, limit: int = 8) -> pd.DataFrame:
+        """全銘柄の直近N四半期の損益計算書を取得（pos 1=最新）"""
+        return self._get_recent_statement_rows(
+            'income_statements_quarterly',
+            ['fiscal_year', 'fiscal_quarter', 'revenue', 'net_income', 'eps', 'eps_diluted'],
+            limit
+        )
+
+    def get_all_income_statements_annual(self, limit: int = 5) -> pd.DataFrame:
+        """全銘柄の直近N年の損益計算書を取得（pos 1=最新）"""
+        return self._get_recent_statement_rows(
+            'income_statements_annual',
+            ['fiscal_year', 'revenue', 'net_income', 'eps', 'eps_diluted'],
+            limit
+        )
+
     def has_income_data(self, ticker: str, min_quarters: int = 5) -> bool:
         """指定された四半期数以上の損益計算書データが存在するかチェック"""
         cursor = self.conn.cursor()
@@ -437,7 +747,7 @@ class IBDDatabase:
             (ticker, date, fiscal_year, total_assets, total_liabilities, total_stockholders_equity, total_equity)
             VALUES (:ticker, :date, :fiscal_year, :total_assets, :total_liabilities, :total_stockholders_equity, :total_equity)
         ''', records)
-        self.conn.commit()
+        self.commit()
 
     def get_balance_sheet_annual(self, ticker: str, limit: int = 5) -> List[Dict]:
         """年次貸借対照表を取得"""
@@ -454,6 +764,29 @@ class IBDDatabase:
 
         return [dict(row) for row in rows]
 
+    def get_all_balance_sheet_annual(self, limit: int = 5) -> pd.DataFrame:
+        """全銘柄の直近N年の貸借対照表を取得（pos 1=最新）"""
+        return self._get_recent_statement_rows(
+            'balance_sheet_annual',
+            ['fiscal_year', 'total_assets', 'total_liabilities', 'total_stockholders_equity', 'total_equity'],
+            limit
+        )
+
+    def _get_recent_statement_rows(self, table: str, columns: List[str], limit: int) -> pd.DataFrame:
+        """財務諸表テーブルから銘柄ごとに新しい順でN行を1クエリで取得"""
+        select_cols = ', '.join(columns)
+        query = f'''
+            SELECT ticker, pos, date, {select_cols}
+            FROM (
+                SELECT ticker, date, {select_cols},
+                       ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS pos
+                FROM {table}
+            )
+            WHERE pos <= ?
+            ORDER BY ticker, pos
+        '''
+        return pd.read_sql_query(query, self.conn, params=(limit,))
+
     def has_balance_sheet_data(self, ticker: str, min_years: int = 1) -> bool:
         """指定された年数以上の貸借対照表データが存在するかチェック"""
         cursor = self.conn.cursor()
@@ -483,7 +816,29 @@ class IBDDatabase:
             profile.get('website'),
             profile.get('country')
         ))
-        self.conn.commit()
+        self.commit()
+
+    def insert_company_profiles_bulk(self, profiles: List[Dict]) -> int:
+        """
+        企業プロファイルを一括挿入
+
+        Args:
+            profiles: ticker と companyName, sector, industry, mktCap などを持つ辞書のリスト
+        """
+        if not profiles:
+            return 0
+
+        keys = ['companyName', 'sector', 'industry', 'mktCap', 'description', 'ceo', 'website', 'country']
+        records = [(p['ticker'], *(p.get(k) for k in keys)) for p in profiles]
+
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO company_profiles
+            (ticker, company_name, sector, industry, market_cap, description, ceo, website, country, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_company_profile(self, ticker: str) -> Optional[Dict]:
         """企業プロファイルを取得"""
@@ -492,6 +847,15 @@ class IBDDatabase:
         row = cursor.fetchone()
         return dict(row) if row else None
 
+    def get_all_company_profiles(self) -> pd.DataFrame:
+        """全銘柄の企業プロファイル（セクター・産業・時価総額）を取得"""
+        query = '''
+            SELECT ticker, company_name, sector, industry, market_cap
+            FROM company_profiles
+            ORDER BY ticker
+        '''
+        return pd.read_sql_query(query, self.conn)
+
     # ==================== 計算済みRS値 ====================
 
     def insert_calculated_rs(self, ticker: str, rs_value: float, roc_63d: float, roc_126d: float, roc_189d: float, roc_252d: float):
@@ -502,7 +866,32 @@ class IBDDatabase:
             (ticker, rs_value, roc_63d, roc_126d, roc_189d, roc_252d, calculated_at)
             VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (ticker, rs_value, roc_63d, roc_126d, roc_189d, roc_252d))
-        self.conn.commit()
+        self.commit()
+
+    def insert_calculated_rs_bulk(self, rs_df: pd.DataFrame) -> int:
+        """
+        計算済みRS値を一括挿入
+
+        Args:
+            rs_df: ticker, rs_value, roc_63d, roc_126d, roc_189d, roc_252d 列を持つDataFrame
+
+        Returns:
+            int: 挿入した行数
+        """
+        if rs_df is None or len(rs_df) == 0:
+            return 0
+
+        columns = ['ticker', 'rs_value', 'roc_63d', 'roc_126d', 'roc_189d', 'roc_252d']
+        records = _records_from_df(rs_df, columns)
+
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO calculated_rs
+            (ticker, rs_value, roc_63d, roc_126d, roc_189d, roc_252d, calculated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_all_rs_values(self) -> Dict[str, float]:
         """全銘柄のRS値を取得"""
@@ -521,7 +910,32 @@ class IBDDatabase:
             (ticker, eps_growth_last_qtr, eps_growth_prev_qtr, annual_growth_rate, stability_score, calculated_at)
             VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (ticker, eps_growth_last_qtr, eps_growth_prev_qtr, annual_growth_rate, stability_score))
-        self.conn.commit()
+        self.commit()
+
+    def insert_calculated_eps_bulk(self, eps_df: pd.DataFrame) -> int:
+        """
+        計算済みEPS要素を一括挿入
+
+        Args:
+            eps_df: ticker, eps_growth_last_qtr, eps_growth_prev_qtr, annual_growth_rate, stability_score 列を持つDataFrame
+
+        Returns:
+            int: 挿入した行数
+        """
+        if eps_df is None or len(eps_df) == 0:
+            return 0
+
+        columns = ['ticker', 'eps_growth_last_qtr', 'eps_growth_prev_qtr', 'annual_growth_rate', 'stability_score']
+        records = _records_from_df(eps_df, columns)
+
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO calculated_eps
+            (ticker, eps_growth_last_qtr, eps_growth_prev_qtr, annual_growth_rate, stability_score, calculated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_all_eps_components(self) -> Dict[str, Dict]:
         """全銘柄のEPS要素を取得"""
@@ -557,7 +971,35 @@ class IBDDatabase:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (ticker, sales_growth_q1, sales_growth_q2, sales_growth_q3, avg_sales_growth_3q,
               pretax_margin_annual, aftertax_margin_quarterly, roe_annual))
-        self.conn.commit()
+        self.commit()
+
+    def insert_calculated_smr_bulk(self, smr_df: pd.DataFrame) -> int:
+        """
+        計算済みSMR要素を一括挿入
+
+        Args:
+            smr_df: ticker, sales_growth_q1〜q3, avg_sales_growth_3q, pretax_margin_annual,
+                    aftertax_margin_quarterly, roe_annual 列を持つDataFrame
+
+        Returns:
+            int: 挿入した行数
+        """
+        if smr_df is None or len(smr_df) == 0:
+            return 0
+
+        columns = ['ticker', 'sales_growth_q1', 'sales_growth_q2', 'sales_growth_q3', 'avg_sales_growth_3q',
+                   'pretax_margin_annual', 'aftertax_margin_quarterly', 'roe_annual']
+        records = _records_from_df(smr_df, columns)
+
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO calculated_smr
+            (ticker, sales_growth_q1, sales_growth_q2, sales_growth_q3, avg_sales_growth_3q,
+             pretax_margin_annual, aftertax_margin_quarterly, roe_annual, calculated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_all_smr_components(self) -> Dict[str, Dict]:
         """全銘柄のSMR要素を取得"""
@@ -594,7 +1036,28 @@ class IBDDatabase:
             (ticker, rs_rating, eps_rating, ad_rating, smr_rating, comp_rating, price_vs_52w_high, industry_group_rs, calculated_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (ticker, rs_rating, eps_rating, ad_rating, smr_rating, comp_rating, price_vs_52w_high, industry_group_rs))
-        self.conn.commit()
+        self.commit()
+
+    def insert_calculated_ratings_bulk(self, ratings_df: pd.DataFrame) -> int:
+        """
+        最終レーティングを一括挿入
+
+        Args:
+            ratings_df: ticker, rs_rating, eps_rating, ad_rating, smr_rating, comp_rating,
+                        price_vs_52w_high, industry_group_rs 列を持つDataFrame
+        """
+        records = _records_from_df(ratings_df, [
+            'ticker', 'rs_rating', 'eps_rating', 'ad_rating', 'smr_rating',
+            'comp_rating', 'price_vs_52w_high', 'industry_group_rs'
+        ])
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO calculated_ratings
+            (ticker, rs_rating, eps_rating, ad_rating, smr_rating, comp_rating, price_vs_52w_high, industry_group_rs, calculated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_all_ratings(self) -> Dict[str, Dict]:
         """全銘柄のレーティングを取得"""
@@ -624,6 +1087,33 @@ class IBDDatabase:
         row = cursor.fetchone()
         return dict(row) if row else None
 
+    def get_screening_features(self) -> pd.DataFrame:
+        """
+        スクリーナー用に全銘柄のレーティング・EPS・プロファイルを1クエリで取得
+
+        Returns:
+            DataFrame: ticker順。has_rating / has_eps / has_profile 列で各テーブルの行の有無を示す
+        """
+        query = '''
+            SELECT t.ticker,
+                   r.ticker IS NOT NULL AS has_rating,
+                   r.rs_rating, r.eps_rating, r.ad_rating, r.smr_rating, r.comp_rating,
+                   r.price_vs_52w_high, r.industry_group_rs,
+                   e.ticker IS NOT NULL AS has_eps,
+                   e.eps_growth_last_qtr,
+                   p.ticker IS NOT NULL AS has_profile,
+                   p.sector, p.industry, p.market_cap
+            FROM tickers t
+            LEFT JOIN calculated_ratings r ON r.ticker = t.ticker
+            LEFT JOIN calculated_eps e ON e.ticker = t.ticker
+            LEFT JOIN company_profiles p ON p.ticker = t.ticker
+            ORDER BY t.ticker
+        '''
+        df = pd.read_sql_query(query, self.conn)
+        for flag in ('has_rating', 'has_eps', 'has_profile'):
+            df[flag] = df[flag].astype(bool)
+        return df
+
     # ==================== セクターパフォーマンス ====================
 
     def insert_sector_performance(self, sector: str, date: str, change_percentage: float):
@@ -633,7 +1123,7 @@ class IBDDatabase:
             INSERT OR REPLACE INTO sector_performance (sector, date, change_percentage)
             VALUES (?, ?, ?)
         ''', (sector, date, change_percentage))
-        self.conn.commit()
+        self.commit()
 
     def insert_sector_performance_bulk(self, data: List[Dict]):
         """セクターパフォーマンスデータを一括挿入"""
@@ -642,7 +1132,7 @@ class IBDDatabase:
             INSERT OR REPLACE INTO sector_performance (sector, date, change_percentage)
             VALUES (:sector, :date, :change_percentage)
         ''', data)
-        self.conn.commit()
+        self.commit()
 
     def get_sector_performance_history(self, sector: str, days: int = 300) -> Optional[pd.DataFrame]:
         """特定セクターのパフォーマンス履歴を取得"""
@@ -679,7 +1169,27 @@ class IBDDatabase:
             (ticker, sector, industry, stock_rs_value, sector_rs_value, industry_group_rs_value, calculated_at)
             VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (ticker, sector, industry, stock_rs_value, sector_rs_value, industry_group_rs_value))
-        self.conn.commit()
+        self.commit()
+
+    def insert_industry_group_rs_bulk(self, industry_rs_df: pd.DataFrame) -> int:
+        """
+        Industry Group RSを一括挿入
+
+        Args:
+            industry_rs_df: ticker, sector, industry, stock_rs_value, sector_rs_value,
+                            industry_group_rs_value 列を持つDataFrame
+        """
+        records = _records_from_df(industry_rs_df, [
+            'ticker', 'sector', 'industry', 'stock_rs_value', 'sector_rs_value', 'industry_group_rs_value'
+        ])
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO calculated_industry_group_rs
+            (ticker, sector, industry, stock_rs_value, sector_rs_value, industry_group_rs_value, calculated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', records)
+        self.commit()
+        return len(records)
 
     def get_all_industry_group_rs(self) -> Dict[str, float]:
         """全銘柄のIndustry Group RS値を取得"""
@@ -694,8 +1204,628 @@ class IBDDatabase:
         row = cursor.fetchone()
         return dict(row) if row else None
 
+    # ==================== 最新指標 ====================
+
+    # 最新指標の計算に使用する銘柄ごとの最大行数（52週 + 余裕分）
+    LATEST_METRICS_DAYS = 260
+
+    LATEST_METRICS_COLUMNS = [
+        'ticker', 'as_of_date', 'history_days', 'price', 'pct_change_1d', 'change_from_open',
+        'pct_1w', 'pct_1m', 'pct_3m', 'pct_6m', 'ma_10', 'ma_21', 'ma_50', 'ma_150', 'ma_200',
+        'high_52w', 'low_52w', 'avg_vol_50', 'avg_vol_90', 'current_volume', 'vol_change_pct',
+        'rel_volume', 'up_volume_50', 'down_volume_50'
+    ]
+
+    def refresh_latest_metrics(self) -> int:
+        """
+        全銘柄の最新指標を再計算してlatest_metricsに保存（株価の取り込み後に呼び出す）
+
+        Returns:
+            int: 保存した銘柄数
+        """
+        metrics = self.compute_latest_metrics()
+        records = _records_from_df(metrics, self.LATEST_METRICS_COLUMNS)
+        placeholders = ', '.join('?' * len(self.LATEST_METRICS_COLUMNS))
+        with self.transaction():
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM latest_metrics')
+            cursor.executemany(f'''
+                INSERT INTO latest_metrics ({', '.join(self.LATEST_METRICS_COLUMNS)}, updated_at)
+                VALUES ({placeholders}, CURRENT_TIMESTAMP)
+            ''', records)
+        return len(records)
+
+    def compute_latest_metrics(self) -> pd.DataFrame:
+        """
+        全銘柄の最新指標（騰落率・移動平均・52週高安値・出来高指標）を計算
+
+        price_historyから銘柄ごとの直近行を1クエリで取得し、(営業日オフセット × 銘柄) の
+        行列演算で計算する。
+
+        Returns:
+            DataFrame: LATEST_METRICS_COLUMNS の列を持つ1銘柄1行のDataFrame
+        """
+        rows = self.get_recent_price_rows(
+            days=self.LATEST_METRICS_DAYS, columns=('open', 'high', 'low', 'close', 'volume')
+        )
+        if rows.empty:
+            return pd.DataFrame(columns=self.LATEST_METRICS_COLUMNS)
+
+        def matrix(column):
+            return rows.pivot(index='pos', columns='ticker', values=column).reindex(
+                range(1, self.LATEST_METRICS_DAYS + 1)
+            )
+
+        close, open_, volume = matrix('close'), matrix('open'), matrix('volume')
+        latest = rows[rows['pos'] == 1].set_index('ticker')
+        metrics = pd.DataFrame(index=close.columns)
+        metrics['as_of_date'] = latest['date']
+        metrics['history_days'] = rows.groupby('ticker').size()
+
+        price = close.loc[1]
+        metrics['price'] = price
+
+        def pct_change(base, zero_value=np.nan):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change = (price - base) / base * 100
+            return change.where(base != 0, zero_value)
+
+        # 騰落率（基準値が0の場合: 前日比・始値比は0、期間騰落率は欠損）
+        metrics['pct_change_1d'] = pct_change(close.loc[2], 0)
+        metrics['change_from_open'] = pct_change(open_.loc[1], 0)
+        for column, offset in (('pct_1w', 6), ('pct_1m', 21), ('pct_3m', 63), ('pct_6m', 126)):
+            metrics[column] = pct_change(close.loc[offset])
+
+        # 移動平均（期間分のデータがない場合は欠損）
+        for window in (10, 21, 50, 150, 200):
+            metrics[f'ma_{window}'] = close.iloc[:window].mean(skipna=False)
+
+        # 52週高値・安値（過去365日）
+        cutoff = (pd.Timestamp.now(tz='UTC').normalize() - pd.Timedelta(days=365)).strftime('%Y-%m-%d')
+        last_year = rows[rows['date'] >= cutoff].groupby('ticker')
+        metrics['high_52w'] = last_year['high'].max()
+        metrics['low_52w'] = last_year['low'].min()
+
+        # 出来高指標
+        avg_vol_50 = volume.iloc[:50].mean(skipna=False)
+        current_volume = volume.loc[1]
+        metrics['avg_vol_50'] = avg_vol_50
+        metrics['avg_vol_90'] = volume.iloc[:90].mean(skipna=False)
+        metrics['current_volume'] = current_volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics['vol_change_pct'] = ((current_volume - avg_vol_50) / avg_vol_50 * 100).where(avg_vol_50 > 0, 0)
+            metrics['rel_volume'] = (current_volume / avg_vol_50).where(avg_vol_50 > 0, 0)
+
+        # 直近50日の上昇日・下落日の出来高合計
+        prev_close = close.shift(-1)
+        recent_volume = volume.iloc[:50]
+        metrics['up_volume_50'] = recent_volume.where(close.iloc[:50] > prev_close.iloc[:50]).sum()
+        metrics['down_volume_50'] = recent_volume.where(close.iloc[:50] < prev_close.iloc[:50]).sum()
+
+        return metrics.rename_axis('ticker').reset_index().reindex(columns=self.LATEST_METRICS_COLUMNS)
+
+    def get_latest_metrics(self, ticker: str) -> Optional[Dict]:
+        """特定銘柄の最新指標を取得"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM latest_metrics WHERE ticker = ?', (ticker,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def get_all_latest_metrics(self) -> Dict[str, Dict]:
+        """全銘柄の最新指標を取得"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM latest_metrics')
+        return {row['ticker']: dict(row) for row in cursor.fetchall()}
+
+    # ==================== 収集ジョブの実行ジャーナル ====================
+
+    def start_collection_run(self, use_full_dataset: bool = True) -> int:
+        """新しい収集ジョブを登録してrun_idを返す"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'INSERT INTO collection_runs (status, use_full_dataset) VALUES (?, ?)',
+            ('running', int(use_full_dataset))
+        )
+        self.commit()
+        return cursor.lastrowid
+
+    def get_incomplete_collection_run(self, max_age_hours: int = 12) -> Optional[Dict]:
+        """再開可能な（未完了かつ指定時間内に開始された）最新の収集ジョブを取得"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT * FROM collection_runs
+            WHERE status = 'running' AND started_at >= datetime('now', ?)
+            ORDER BY run_id DESC
+            LIMIT 1
+        ''', (f'-{int(max_age_hours)} hours',))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def finish_collection_run(self, run_id: int, status: str = 'completed'):
+        """収集ジョブを終了状態にする"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'UPDATE collection_runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?',
+            (status, run_id)
+        )
+        self.commit()
+
+    def abandon_incomplete_collection_runs(self):
+        """未完了の収集ジョブをすべて破棄済みにする（新規実行時）"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE collection_runs SET status = 'abandoned', finished_at = CURRENT_TIMESTAMP WHERE status = 'running'"
+        )
+        self.commit()
+
+    def mark_collection_step_done(self, run_id: int, step: str):
+        """収集ジョブのステップ完了を記録"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'INSERT OR REPLACE INTO collection_run_steps (run_id, step, completed_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+            (run_id, step)
+        )
+        self.commit()
+
+    def get_completed_collection_steps(self, run_id: int) -> set:
+        """収集ジョブで完了済みのステップ名を取得"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT step FROM collection_run_steps WHERE run_id = ?', (run_id,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def add_collection_run_tickers(self, run_id: int, tickers: List[str]):
+        """収集対象の銘柄を pending として登録（登録順を保持）"""
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO collection_run_tickers (run_id, ticker, status) VALUES (?, ?, 'pending')",
+            [(run_id, t) for t in tickers]
+        )
+        self.commit()
+
+    def mark_collection_run_tickers(self, run_id: int, tickers: List[str], status: str):
+        """銘柄の収集状態（collected / failed）を記録"""
+        if not tickers:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            UPDATE collection_run_tickers SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE run_id = ? AND ticker = ?
+        ''', [(status, run_id, t) for t in tickers])
+        self.commit()
+
+    def get_collection_run_tickers(self, run_id: int, status: str = None) -> List[str]:
+        """収集ジョブの銘柄を登録順に取得（statusで絞り込み可能）"""
+        cursor = self.conn.cursor()
+        if status is None:
+            cursor.execute('SELECT ticker FROM collection_run_tickers WHERE run_id = ? ORDER BY rowid', (run_id,))
+        else:
+            cursor.execute(
+                'SELECT ticker FROM collection_run_tickers WHERE run_id = ? AND status = ? ORDER BY rowid',
+                (run_id, status)
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+    # ==================== スナップショット ====================
+
+    RATING_SNAPSHOT_COLUMNS = [
+        'rs_rating', 'eps_rating', 'ad_rating', 'smr_rating',
+        'comp_rating', 'industry_group_rs', 'price_vs_52w_high'
+    ]
+
+    def snapshot_ratings(self, date: str = None) -> int:
+        """
+        calculated_ratingsの現在値をratings_snapshotsに保存
+
+        Args:
+            date: スナップショットの日付（省略時は最新の株価日付）
+
+        Returns:
+            int: 保存した銘柄数
+        """
+        date = date or self.get_latest_price_date()
+        if date is None:
+            return 0
+        columns = ', '.join(self.RATING_SNAPSHOT_COLUMNS)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO ratings_snapshots (date, ticker, {columns})
+            SELECT ?, ticker, {columns} FROM calculated_ratings
+        ''', (date,))
+        self.commit()
+        return cursor.rowcount
+
+    def save_screener_snapshot(self, screener_results: Dict[str, List], date: str = None) -> int:
+        """
+        スクリーナー結果（該当銘柄の一覧）をscreener_snapshotsに保存
+
+        Args:
+            screener_results: スクリーナー名 -> 銘柄リスト（ティッカー文字列または 'ticker' を含むdict）
+            date: スナップショットの日付（省略時は最新の株価日付）
+
+        Returns:
+            int: 保存した行数
+        """
+        date = date or self.get_latest_price_date()
+        if date is None or not screener_results:
+            return 0
+        records = []
+        for screener, items in screener_results.items():
+            for item in items:
+                ticker = item.get('ticker') if isinstance(item, dict) else item
+                if ticker:
+                    records.append((date, screener, str(ticker)))
+        with self.transaction():
+            cursor = self.conn.cursor()
+            placeholders = ','.join('?' * len(screener_results))
+            cursor.execute(f'''
+                DELETE FROM screener_snapshots WHERE date = ? AND screener IN ({placeholders})
+            ''', (date, *screener_results.keys()))
+            cursor.executemany('''
+                INSERT OR IGNORE INTO screener_snapshots (date, screener, ticker) VALUES (?, ?, ?)
+            ''', records)
+        return len(records)
+
+    def get_snapshot_dates(self, table: str = 'ratings_snapshots') -> List[str]:
+        """スナップショットが存在する日付の一覧（新しい順）"""
+        if table not in ('ratings_snapshots', 'screener_snapshots'):
+            raise ValueError(f"不明なスナップショットテーブル: {table}")
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT DISTINCT date FROM {table} ORDER BY date DESC')
+        return [row[0] for row in cursor.fetchall()]
+
+    def _resolve_snapshot_dates(self, table: str, date: str = None, prev_date: str = None):
+        """比較する2つのスナップショット日付を決定（省略時は最新とその直前）"""
+        cursor = self.conn.cursor()
+        if date is None:
+            cursor.execute(f'SELECT MAX(date) FROM {table}')
+            date = cursor.fetchone()[0]
+        if date is not None and prev_date is None:
+            cursor.execute(f'SELECT MAX(date) FROM {table} WHERE date < ?', (date,))
+            prev_date = cursor.fetchone()[0]
+        return date, prev_date
+
+    def get_rating_changes(self, min_change: int = 5, column: str = 'comp_rating',
+                           date: str = None, prev_date: str = None) -> pd.DataFrame:
+        """
+        2つのスナップショット間でレーティングがmin_change以上変化した銘柄を取得
+
+        Args:
+            min_change: 変化幅の閾値（絶対値）
+            column: 比較するレーティング列（rs_rating, eps_rating, comp_rating, industry_group_rs）
+            date: 比較対象の日付（省略時は最新のスナップショット）
+            prev_date: 比較元の日付（省略時はdateの直前のスナップショット）
+
+        Returns:
+            DataFrame: ticker, previous, current, change（変化幅の大きい順。前回にない銘柄は previous が NaN）
+        """
+        if column not in ('rs_rating', 'eps_rating', 'comp_rating', 'industry_group_rs'):
+            raise ValueError(f"数値のレーティング列を指定してください: {column}")
+        date, prev_date = self._resolve_snapshot_dates('ratings_snapshots', date, prev_date)
+        empty = pd.DataFrame(columns=['ticker', 'previous', 'current', 'change'])
+        if date is None or prev_date is None:
+            return empty
+
+        query = f'''
+            SELECT cur.ticker, prev.{column} AS previous, cur.{column} AS current,
+                   cur.{column} - prev.{column} AS change
+            FROM ratings_snapshots cur
+            LEFT JOIN ratings_snapshots prev ON prev.date = ? AND prev.ticker = cur.ticker
+            WHERE cur.date = ?
+              AND (prev.ticker IS NULL OR ABS(cur.{column} - prev.{column}) >= ?)
+            ORDER BY ABS(change) DESC, cur.ticker
+        '''
+        return pd.read_sql_query(query, self.conn, params=(prev_date, date, min_change))
+
+    def get_screener_changes(self, screener: str = None, date: str = None,
+                             prev_date: str = None) -> Dict[str, Dict[str, List[str]]]:
+        """
+        2つのスナップショット間でスクリーナーに新規該当・除外された銘柄を取得
+
+        Args:
+            screener: スクリーナー名（省略時は全スクリーナー）
+            date: 比較対象の日付（省略時は最新のスナップショット）
+            prev_date: 比較元の日付（省略時はdateの直前のスナップショット。なければ全銘柄が新規扱い）
+
+        Returns:
+            Dict[str, Dict]: スクリーナー名 -> {'entered': [...], 'left': [...]}
+        """
+        date, prev_date = self._resolve_snapshot_dates('screener_snapshots', date, prev_date)
+        if date is None:
+            return {}
+
+        screener_filter = 'AND s.screener = ?' if screener else ''
+        extra = (screener,) if screener else ()
+        query = f'''
+            SELECT s.screener, s.ticker
+            FROM screener_snapshots s
+            WHERE s.date = ? {screener_filter}
+              AND NOT EXISTS (
+                  SELECT 1 FROM screener_snapshots o
+                  WHERE o.date = ? AND o.screener = s.screener AND o.ticker = s.ticker
+              )
+            ORDER BY s.screener, s.ticker
+        '''
+        changes = {}
+        if screener:
+            changes[screener] = {'entered': [], 'left': []}
+        cursor = self.conn.cursor()
+        for change, (target, other) in (('entered', (date, prev_date)), ('left', (prev_date, date))):
+            cursor.execute(query, (target, *extra, other))
+            for name, ticker in cursor.fetchall():
+                changes.setdefault(name, {'entered': [], 'left': []})[change].append(ticker)
+        return changes
+
+    def prune_snapshots(self, keep_days: int = 400) -> int:
+        """直近keep_days日分（スナップショットのある日付の数）より古いスナップショットを削除"""
+        deleted = 0
+        with self.transaction():
+            cursor = self.conn.cursor()
+            for table in ('ratings_snapshots', 'screener_snapshots'):
+                dates = self.get_snapshot_dates(table)
+                if len(dates) > keep_days:
+                    cursor.execute(f'DELETE FROM {table} WHERE date <= ?', (dates[keep_days],))
+                    deleted += cursor.rowcount
+        return deleted
+
+    # ==================== 株価アーカイブ ====================
+
+    def _archive_path(self, year: int) -> str:
+        return os.path.join(self.archive_dir, f'price_history_{year}.db')
+
+    def get_archive_years(self) -> List[int]:
+        """アーカイブDBが存在する年の一覧を取得"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        years = []
+        for name in os.listdir(self.archive_dir):
+            stem, ext = os.path.splitext(name)
+            if ext == '.db' and stem.startswith('price_history_') and stem[14:].isdigit():
+                years.append(int(stem[14:]))
+        return sorted(years)
+
+    def get_price_hot_cutoff(self, keep_sessions: int = None) -> Optional[str]:
+        """
+        ホット層に残す最古の日付を取得（直近keep_sessions営業日の先頭日）
+
+        Returns:
+            str: この日付より前の行がアーカイブ対象（営業日数が足りない場合None）
+        """
+        keep_sessions = keep_sessions or self.PRICE_HOT_SESSIONS
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT date FROM (SELECT DISTINCT date FROM price_history)
+            ORDER BY date DESC
+            LIMIT 1 OFFSET ?
+        ''', (keep_sessions - 1,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def archive_price_history(self, keep_sessions: int = None, vacuum: bool = False) -> Dict[int, int]:
+        """
+        ホット層（price_history）から古い日足を年別アーカイブDBへ移動
+
+        スクリーナー・RS計算が参照するのは直近の営業日のみのため、それより古い行を
+        ibd_archive/price_history_YYYY.db に移してホット層の大きさを一定に保つ。
+        WALモードではATTACHしたDBをまたぐトランザクションの原子性が保証されないため、
+        年ごとに (1) アーカイブへの書き込みをコミット、(2) アーカイブの行数がホット層の
+        対象行数と一致することを確認、(3) ホット層から削除、の順に別トランザクションで行う。
+        途中で中断してもホット層の行は残り、INSERT OR REPLACE のため再実行しても重複しない。
+
+        Args:
+            keep_sessions: ホット層に残す営業日数（デフォルト PRICE_HOT_SESSIONS）
+            vacuum: 移動後にVACUUMしてファイルを縮小するか
+
+        Returns:
+            Dict[int, int]: 年 -> 移動した行数
+        """
+        if self.read_only:
+            raise RuntimeError("読み取り専用接続ではアーカイブできません")
+        keep_sessions = keep_sessions or self.PRICE_HOT_SESSIONS
+        if keep_sessions < self.LATEST_METRICS_DAYS:
+            raise ValueError(f"keep_sessionsは{self.LATEST_METRICS_DAYS}以上を指定してください")
+
+        cutoff = self.get_price_hot_cutoff(keep_sessions)
+        if cutoff is None:
+            print(f"price_historyは{keep_sessions}営業日以内のため、アーカイブ対象はありません")
+            return {}
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT CAST(substr(date, 1, 4) AS INTEGER)
+            FROM price_history WHERE date < ?
+        ''', (cutoff,))
+        years = sorted(row[0] for row in cursor.fetchall())
+        if not years:
+            print(f"{cutoff} より前の日足はありません")
+            return {}
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        print(f"{cutoff} より前の日足をアーカイブ中: {', '.join(str(y) for y in years)}")
+        moved = {}
+        for year in years:
+            year_range = (f'{year}-01-01', f'{year + 1}-01-01', cutoff)
+            cursor.execute('ATTACH DATABASE ? AS archive', (self._archive_path(year),))
+            try:
+                # アーカイブのコミットはディスクへの書き込み完了まで待つ（削除より先に永続化する）
+                cursor.execute('PRAGMA archive.synchronous=FULL')
+                cursor.execute(PRICE_ARCHIVE_SCHEMA.format(table='archive.price_history'))
+
+                # 1. アーカイブへコピー
+                with self.transaction():
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO archive.price_history (ticker, date, open, high, low, close, volume)
+                        SELECT ticker, date, open, high, low, close, volume
+                        FROM price_history
+                        WHERE date >= ? AND date < ? AND date < ?
+                    ''', year_range)
+
+                # 2. ホット層の対象行がすべてアーカイブにあることを確認
+                cursor.execute('''
+                    SELECT COUNT(*),
+                           SUM(EXISTS (SELECT 1 FROM archive.price_history a
+                                       WHERE a.ticker = h.ticker AND a.date = h.date))
+                    FROM price_history h
+                    WHERE h.date >= ? AND h.date < ? AND h.date < ?
+                ''', year_range)
+                hot_count, archived_count = cursor.fetchone()
+                if hot_count != (archived_count or 0):
+                    raise RuntimeError(
+                        f"{year}年のアーカイブ行数が一致しません（ホット層 {hot_count}, アーカイブ {archived_count}）。"
+                        f"ホット層の削除を中止しました"
+                    )
+
+                # 3. ホット層から削除
+                with self.transaction():
+                    cursor.execute('''
+                        DELETE FROM price_history
+                        WHERE date >= ? AND date < ? AND date < ?
+                    ''', year_range)
+                    moved[year] = cursor.rowcount
+            finally:
+                cursor.execute('DETACH DATABASE archive')
+            print(f"  {year}: {moved[year]:,} 行")
+
+        if vacuum:
+            size_before = os.path.getsize(self.db_path)
+            print("  VACUUMを実行中...")
+            self.conn.execute('VACUUM')
+            size_after = os.path.getsize(self.db_path)
+            print(f"  ファイルサイズ: {size_before / 1024**2:,.1f} MB -> {size_after / 1024**2:,.1f} MB")
+        return moved
+
+    def get_price_history_range(self, ticker: str, start_date: str = None,
+                                end_date: str = None) -> Optional[pd.DataFrame]:
+        """
+        期間を指定して株価履歴を取得（ホット層と該当年のアーカイブを結合）
+
+        Args:
+            ticker: ティッカーシンボル
+            start_date: 開始日（YYYY-MM-DD、含む。省略時は全期間）
+            end_date: 終了日（YYYY-MM-DD、含む。省略時は最新まで）
+        """
+        params = (ticker, start_date or '0000-00-00', end_date or '9999-99-99')
+        query = '''
+            SELECT date, open, high, low, close, volume
+            FROM price_history
+            WHERE ticker = ? AND date >= ? AND date <= ?
+        '''
+
+        frames = [pd.read_sql_query(query, self.conn, params=params)]
+        first_year = int(start_date[:4]) if start_date else 0
+        last_year = int(end_date[:4]) if end_date else 9999
+        for year in self.get_archive_years():
+            if first_year <= year <= last_year:
+                with self._open_archive(year) as archive_conn:
+                    frames.append(pd.read_sql_query(query, archive_conn, params=params))
+
+        frames = [f for f in frames if len(f) > 0]
+        if not frames:
+            return None
+        # アーカイブ移動と並行して読んだ場合の重複はホット層の行を優先
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(subset='date', keep='first')
+        df['date'] = pd.to_datetime(df['date'])
+        return df.sort_values('date').reset_index(drop=True)
+
+    @contextmanager
+    def _open_archive(self, year: int):
+        """年別アーカイブDBを読み取り専用で開く"""
+        archive_path = os.path.abspath(self._archive_path(year))
+        conn = sqlite3.connect(f'file:{archive_path}?mode=ro', uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_archive_stats(self) -> Dict[int, Dict]:
+        """年別アーカイブDBの行数・ファイルサイズを取得"""
+        stats = {}
+        for year in self.get_archive_years():
+            with self._open_archive(year) as archive_conn:
+                rows = archive_conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+            stats[year] = {'rows': rows, 'size_mb': os.path.getsize(self._archive_path(year)) / 1024**2}
+        return stats
+
     # ==================== ユーティリティ ====================
 
+    def _is_legacy_price_history(self) -> bool:
+        """price_historyが旧形式（AUTOINCREMENTのidカラムあり）かどうか"""
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(price_history)')]
+        return 'id' in columns
+
+    def migrate_price_history(self, chunk_size: int = 200, vacuum: bool = True) -> bool:
+        """
+        旧形式のprice_historyを WITHOUT ROWID 形式に変換（既存DBをその場で変換）
+
+        銘柄をchunk_size件ずつ新テーブルへコピーし、チャンクごとにコミットする。
+        中断した場合も再実行すればコピー済みの銘柄をスキップして再開する。
+        コピー中に旧テーブルへ書き込まれた行は、最後の切り替え時に取り込む。
+
+        Args:
+            chunk_size: 1トランザクションでコピーする銘柄数
+            vacuum: 変換後にVACUUMしてファイルを縮小するか
+
+        Returns:
+            bool: 変換を実行した場合True（変換済みの場合False）
+        """
+        if not self._is_legacy_price_history():
+            print("price_historyは既に新形式です")
+            return False
+
+        size_before = os.path.getsize(self.db_path)
+        cursor = self.conn.cursor()
+        cursor.execute(PRICE_HISTORY_SCHEMA.format(table='price_history_new'))
+        cursor.execute('CREATE TABLE IF NOT EXISTS price_history_migration (watermark INTEGER)')
+        # コピー開始時点の最大idを記録（INSERT OR REPLACEで更新された行は新しいidになる）
+        cursor.execute('SELECT watermark FROM price_history_migration')
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute('INSERT INTO price_history_migration (watermark) SELECT COALESCE(MAX(id), 0) FROM price_history')
+            cursor.execute('SELECT watermark FROM price_history_migration')
+            row = cursor.fetchone()
+        watermark = row[0]
+        self.conn.commit()
+
+        copy_sql = '''
+            INSERT OR REPLACE INTO price_history_new (ticker, date, open, high, low, close, volume)
+            SELECT ticker, date, open, high, low, close, CAST(volume AS INTEGER)
+            FROM price_history
+        '''
+
+        all_tickers = [r[0] for r in cursor.execute('SELECT DISTINCT ticker FROM price_history ORDER BY ticker')]
+        done = {r[0] for r in cursor.execute('SELECT DISTINCT ticker FROM price_history_new')}
+        remaining = [t for t in all_tickers if t not in done]
+        print(f"price_historyを変換中: {len(all_tickers)} 銘柄（コピー済み {len(all_tickers) - len(remaining)}）")
+
+        copied_rows = 0
+        for i in range(0, len(remaining), chunk_size):
+            chunk = remaining[i:i+chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'{copy_sql} WHERE ticker IN ({placeholders})', chunk)
+            copied_rows += cursor.rowcount
+            self.conn.commit()
+            print(f"  進捗: {min(i + chunk_size, len(remaining))}/{len(remaining)} 銘柄, {copied_rows:,} 行")
+
+        # 切り替え: 開始後に書き込まれた行を取り込み、旧テーブルと置き換える
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute(f'{copy_sql} WHERE id > ?', (watermark,))
+            cursor.execute('DROP INDEX IF EXISTS idx_price_ticker_date')
+            cursor.execute('DROP TABLE price_history')
+            cursor.execute('ALTER TABLE price_history_new RENAME TO price_history')
+            cursor.execute('DROP TABLE price_history_migration')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        print("  新形式のテーブルに切り替えました")
+
+        if vacuum:
+            print("  VACUUMを実行中...")
+            self.conn.execute('VACUUM')
+            size_after = os.path.getsize(self.db_path)
+            print(f"  ファイルサイズ: {size_before / 1024**2:,.1f} MB -> {size_after / 1024**2:,.1f} MB")
+        return True
+
     def clear_all_data(self):
         """全データをクリア（テスト用）"""
         cursor = self.conn.cursor()
@@ -706,7 +1836,7 @@ class IBDDatabase:
         ]
         for table in tables:
             cursor.execute(f'DELETE FROM {table}')
-        self.conn.commit()
+        self.commit()
         print("全データをクリアしました")
 
     def get_database_stats(self):
@@ -718,7 +1848,8 @@ class IBDDatabase:
             'tickers', 'price_history', 'income_statements_quarterly',
             'income_statements_annual', 'company_profiles', 'calculated_rs',
             'calculated_eps', 'calculated_smr', 'calculated_ratings',
-            'sector_performance', 'calculated_industry_group_rs'
+            'sector_performance', 'calculated_industry_group_rs', 'latest_metrics',
+            'ratings_snapshots', 'screener_snapshots'
         ]
 
         for table in tables:
@@ -732,5 +1863,7 @@ class IBDDatabase:
         print("\n=== データベース統計 ===")
         for table, count in stats.items():
             print(f"  {table}: {count:,} レコード")
+        for year, archive in self.get_archive_stats().items():
+            print(f"  price_history ({year} アーカイブ): {archive['rows']:,} レコード, {archive['size_mb']:,.1f} MB")
 
         return stats
@@ -0,0 +1,251 @@
+"""
+IBD Feature Snapshot
+
+スクリーナー用の特徴量テーブルをメモリに保持し、APIからのアドホックな
+スクリーニングを低レイテンシで実行します。データ収集で latest_metrics /
+calculated_ratings が更新されると、次のチェック時に自動で再読み込みします。
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .ibd_database import IBDDatabase
+from .ibd_screeners import IBDScreeners
+from .ibd_screener_definitions import ScreenerDefinition
+
+
+# 結果に常に含める列
+DEFAULT_SCREEN_COLUMNS = [
+    'rs_rating', 'eps_rating', 'comp_rating', 'smr_rating', 'ad_rating',
+    'price', 'pct_change_1d', 'avg_vol_50', 'sector', 'industry'
+]
+
+# 条件として解釈しないクエリパラメータ
+RESERVED_PARAMS = {'screener', 'sort', 'order', 'limit', 'columns'}
+
+MAX_SCREEN_LIMIT = 500
+
+# 真偽値の特徴量に指定できる値
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def parse_screen_params(params: Dict[str, str]) -> Dict:
+    """
+    クエリパラメータをスクリーニング条件に変換
+
+    - <feature>_min=80 / <feature>_max=99 : 数値の下限・上限（以上・以下）
+    - <feature>=A,B                       : 値の一覧（カンマ区切り）のいずれかに一致
+                                            （数値・真偽値の特徴量は FeatureSnapshot.screen で型を変換）
+    - screener=<name>                     : 定義済みスクリーナーの条件を起点にする
+    - sort=<feature>&order=asc|desc, limit=<n>, columns=<f1,f2>
+
+    Returns:
+        Dict: criteria, screener, sort_by, descending, limit, columns
+
+    Raises:
+        ValueError: 数値に変換できない値や不正なlimitが指定された場合
+    """
+    criteria = []
+    for key, raw in params.items():
+        if key in RESERVED_PARAMS or raw is None or raw == '':
+            continue
+        for suffix, op in (('_min', '>='), ('_max', '<=')):
+            if key.endswith(suffix):
+                try:
+                    value = float(raw)
+                except ValueError:
+                    raise ValueError(f"{key} には数値を指定してください: {raw}")
+                criteria.append({'feature': key[:-len(suffix)], 'op': op, 'value': value})
+                break
+        else:
+            values = [v.strip() for v in raw.split(',') if v.strip()]
+            criteria.append({'feature': key, 'op': 'in', 'value': values})
+
+    try:
+        limit = int(params.get('limit') or 100)
+    except ValueError:
+        raise ValueError(f"limit には整数を指定してください: {params.get('limit')}")
+    if not 1 <= limit <= MAX_SCREEN_LIMIT:
+        raise ValueError(f"limit は1〜{MAX_SCREEN_LIMIT}で指定してください")
+
+    columns = [c.strip() for c in (params.get('columns') or '').split(',') if c.strip()]
+    return {
+        'criteria': criteria,
+        'screener': params.get('screener') or None,
+        'sort_by': params.get('sort') or None,
+        'descending': (params.get('order') or 'desc').lower() != 'asc',
+        'limit': limit,
+        'columns': columns,
+    }
+
+
+class FeatureSnapshot:
+    """メモリ上の特徴量テーブルとその更新管理"""
+
+    # DBの更新有無を確認する間隔（秒）
+    CHECK_INTERVAL_SEC = 60
+
+    def __init__(self, db_path: str = 'data/ibd_data.db'):
+        """
+        Args:
+            db_path: データベースファイルのパス
+        """
+        self.db_path = db_path
+        self.loaded_at: Optional[datetime] = None
+        self._features: Optional[pd.DataFrame] = None
+        self._definitions: Dict[str, ScreenerDefinition] = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_version(self, db: IBDDatabase):
+        """データ収集のたびに変わる値（最新の株価日付、最新指標・レーティングの更新時刻、銘柄数）"""
+        cursor = db.conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT (SELECT MAX(as_of_date) FROM latest_metrics),
+                       (SELECT MAX(updated_at) FROM latest_metrics),
+                       (SELECT MAX(calculated_at) FROM calculated_ratings),
+                       (SELECT COUNT(*) FROM tickers)
+            ''')
+        except sqlite3.OperationalError:
+            # latest_metricsテーブルがない旧バージョンのDB（毎回再読み込みする）
+            return None
+        return tuple(cursor.fetchone())
+
+    def invalidate(self):
+        """次回アクセス時に再読み込みさせる（データ収集直後に呼び出す）"""
+        with self._lock:
+            self._checked_at = 0.0
+            self._version = None
+
+    def get_features(self) -> pd.DataFrame:
+        """特徴量テーブルを取得（DBが更新されていれば再構築）"""
+        now = time.monotonic()
+        if self._features is not None and now - self._checked_at < self.CHECK_INTERVAL_SEC:
+            return self._features
+
+        with self._lock:
+            if self._features is not None and time.monotonic() - self._checked_at < self.CHECK_INTERVAL_SEC:
+                return self._features
+
+            db = IBDDatabase(self.db_path, read_only=True)
+            try:
+                version = self._read_version(db)
+            finally:
+                db.close()
+
+            if self._features is None or version is None or version != self._version:
+                screeners = IBDScreeners(self.db_path, read_only=True)
+                try:
+                    self._features = screeners.get_features()
+                    self._definitions = screeners.definitions
+                finally:
+                    screeners.close()
+                self._version = version
+                self.loaded_at = datetime.now()
+            self._checked_at = time.monotonic()
+            return self._features
+
+    @staticmethod
+    def coerce_criteria(features: pd.DataFrame, criteria: List[Dict]) -> List[Dict]:
+        """
+        クエリパラメータ由来の条件を特徴量の型に合わせる
+
+        文字列のまま数値列と比較すると常に不一致（0件）になるため、数値・真偽値の
+        特徴量に対する一覧条件は値を変換する。
+
+        Raises:
+            ValueError: 存在しない特徴量、型に合わない値を指定した場合
+        """
+        coerced = []
+        for criterion in criteria:
+            feature = criterion['feature']
+            if feature not in features.columns:
+                raise ValueError(f"存在しない特徴量です: {feature}")
+            column = features[feature]
+            is_bool = pd.api.types.is_bool_dtype(column)
+            is_numeric = pd.api.types.is_numeric_dtype(column) and not is_bool
+
+            if criterion['op'] in ('>=', '<='):
+                if not is_numeric:
+                    raise ValueError(f"{feature} は数値の特徴量ではないため _min / _max は指定できません")
+            elif criterion['op'] == 'in' and (is_numeric or is_bool):
+                values = []
+                for v in criterion['value']:
+                    try:
+                        values.append(BOOLEAN_VALUES[v.lower()] if is_bool else float(v))
+                    except (KeyError, ValueError):
+                        expected = 'true / false' if is_bool else '数値'
+                        raise ValueError(f"{feature} には{expected}を指定してください: {v}")
+                criterion = {**criterion, 'value': values}
+            coerced.append(criterion)
+        return coerced
+
+    def screen(self, criteria: List[Dict], screener: str = None, sort_by: str = None,
+               descending: bool = True, limit: int = 100, columns: List[str] = None) -> Dict:
+        """
+        メモリ上の特徴量テーブルに対してアドホックなスクリーニングを実行
+
+        Args:
+            criteria: スクリーナー定義と同じ形式の条件リスト
+            screener: 起点にする定義済みスクリーナー名
+            sort_by: ソートする特徴量（省略時はticker順）
+            descending: 降順でソートするか
+            limit: 返す最大件数
+            columns: 結果に追加する特徴量
+
+        Returns:
+            Dict: matched（該当件数）, results（上位limit件）, universe, as_of, loaded_at
+
+        Raises:
+            KeyError: 存在しないスクリーナーを指定した場合
+            ValueError: 存在しない特徴量や、条件の形式・値が不正な場合
+        """
+        features = self.get_features()
+
+        criteria = self.coerce_criteria(features, criteria)
+        unknown = [c for c in list(columns or []) + ([sort_by] if sort_by else []) if c not in features.columns]
+        if unknown:
+            raise ValueError(f"存在しない特徴量です: {', '.join(dict.fromkeys(unknown))}")
+
+        base_criteria = []
+        output_columns = list(DEFAULT_SCREEN_COLUMNS)
+        if screener:
+            if screener not in self._definitions:
+                raise KeyError(f"スクリーナーが見つかりません: {screener}")
+            base = self._definitions[screener]
+            base_criteria = base.criteria
+            output_columns += base.columns
+        output_columns += [c['feature'] for c in criteria] + list(columns or [])
+        if sort_by:
+            output_columns.append(sort_by)
+
+        definition = ScreenerDefinition(
+            name=screener or 'adhoc',
+            criteria=base_criteria + criteria,
+            columns=list(dict.fromkeys(output_columns)),
+            sort_by=sort_by,
+            descending=descending,
+            limit=limit,
+        )
+        mask_cache = {}
+        matched = int(definition.evaluate(features, mask_cache).sum())
+        results = definition.apply(features, mask_cache)
+
+        return {
+            'matched': matched,
+            'universe': len(features),
+            'results': results,
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+            'as_of': self._version[0] if self._version else None,
+        }
+
+
+# グローバルインスタンス
+feature_snapshot = FeatureSnapshot()
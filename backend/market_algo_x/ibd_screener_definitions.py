@@ -0,0 +1,198 @@
+"""
+IBD Screener Definitions
+
+スクリーナーを設定ファイル（JSON）の宣言的な定義として読み込み、
+特徴量テーブルに対するベクトル化された条件（ブールマスク）にコンパイルします。
+
+定義の形式:
+    {
+      "screener_name": {
+        "title": "表示名",
+        "criteria": [
+          {"feature": "rs_rating", "op": ">=", "value": 80},
+          {"feature": "ma_10", "op": ">", "ref": "ma_21"},
+          {"feature": "ad_rating", "op": "in", "value": ["A", "B"]}
+        ],
+        "columns": ["rs_rating"],          # 結果に含める特徴量
+        "rename": {"pct_change_1d": "price_change_pct"},
+        "round": ["rs_rating"],            # 小数2桁に丸める列
+        "sort": {"by": "rs_rating", "descending": true},
+        "limit": 50
+      }
+    }
+
+欠損値（NaN）はすべての比較で不合格になります。
+"""
+
+import json
+import os
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+DEFAULT_DEFINITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ibd_screeners.json')
+
+# 比較演算子 -> (特徴量の列, 値) からマスクを返す関数
+OPERATORS: Dict[str, Callable[[pd.Series, object], pd.Series]] = {
+    '>=': lambda s, v: s >= v,
+    '>': lambda s, v: s > v,
+    '<=': lambda s, v: s <= v,
+    '<': lambda s, v: s < v,
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s.notna() & (s != v),
+    'in': lambda s, v: s.isin(v),
+    'not_in': lambda s, v: s.notna() & ~s.isin(v),
+    'between': lambda s, v: (s >= v[0]) & (s <= v[1]),
+}
+
+
+class ScreenerDefinition:
+    """1つのスクリーナー定義（コンパイル済みの条件を保持）"""
+
+    def __init__(self, name: str, criteria: List[Dict], columns: List[str] = None,
+                 title: str = None, description: str = None, rename: Dict[str, str] = None,
+                 round_columns: List[str] = None, sort_by: str = None, descending: bool = True,
+                 limit: int = None):
+        self.name = name
+        self.title = title or name
+        self.description = description
+        self.criteria = criteria
+        self.columns = list(columns or [])
+        self.rename = dict(rename or {})
+        self.round_columns = list(round_columns or [])
+        self.sort_by = sort_by
+        self.descending = descending
+        self.limit = limit
+        self._predicates = [self._compile_criterion(c) for c in criteria]
+
+    @classmethod
+    def from_dict(cls, name: str, config: Dict) -> 'ScreenerDefinition':
+        """設定ファイルの1エントリからスクリーナー定義を作成"""
+        sort = config.get('sort') or {}
+        if isinstance(sort, str):
+            sort = {'by': sort}
+        return cls(
+            name=name,
+            criteria=config.get('criteria', []),
+            columns=config.get('columns'),
+            title=config.get('title'),
+            description=config.get('description'),
+            rename=config.get('rename'),
+            round_columns=config.get('round'),
+            sort_by=sort.get('by'),
+            descending=sort.get('descending', True),
+            limit=config.get('limit'),
+        )
+
+    def _compile_criterion(self, criterion: Dict):
+        """条件を (キャッシュキー, 特徴量テーブル -> マスク) に変換"""
+        feature = criterion.get('feature')
+        op = criterion.get('op')
+        if not feature or op not in OPERATORS:
+            raise ValueError(f"{self.name}: 不正な条件です: {criterion}")
+        compare = OPERATORS[op]
+
+        if 'ref' in criterion:
+            # 特徴量同士の比較（例: ma_10 > ma_21）
+            ref = criterion['ref']
+            return (feature, op, 'ref', ref), lambda f: compare(f[feature], f[ref])
+
+        if 'value' not in criterion:
+            raise ValueError(f"{self.name}: value または ref を指定してください: {criterion}")
+        value = criterion['value']
+        if op in ('in', 'not_in'):
+            value = list(value)
+            key_value = tuple(value)
+        elif op == 'between':
+            if len(value) != 2:
+                raise ValueError(f"{self.name}: between には [下限, 上限] を指定してください: {criterion}")
+            key_value = tuple(value)
+        else:
+            key_value = value
+        return (feature, op, 'value', key_value), lambda f: compare(f[feature], value)
+
+    @property
+    def features(self) -> List[str]:
+        """このスクリーナーが参照する特徴量の一覧"""
+        names = []
+        for c in self.criteria:
+            names.append(c['feature'])
+            if 'ref' in c:
+                names.append(c['ref'])
+        names.extend(self.columns)
+        if self.sort_by:
+            names.append(self.sort_by)
+        return list(dict.fromkeys(names))
+
+    def evaluate(self, features: pd.DataFrame, mask_cache: Dict = None) -> pd.Series:
+        """
+        特徴量テーブルに対して全条件のANDを評価
+
+        Args:
+            features: tickerをインデックスとする特徴量テーブル
+            mask_cache: 同じ条件のマスクを複数のスクリーナーで共有するための辞書
+        """
+        missing = [name for name in self.features if name not in features.columns]
+        if missing:
+            raise KeyError(f"{self.name}: 特徴量が見つかりません: {', '.join(missing)}")
+
+        mask = pd.Series(True, index=features.index)
+        for key, predicate in self._predicates:
+            if mask_cache is not None:
+                if key not in mask_cache:
+                    mask_cache[key] = predicate(features).fillna(False).astype(bool)
+                mask &= mask_cache[key]
+            else:
+                mask &= predicate(features).fillna(False).astype(bool)
+        return mask
+
+    def apply(self, features: pd.DataFrame, mask_cache: Dict = None) -> List[Dict]:
+        """
+        スクリーナーを実行して合格銘柄を [{'ticker': ..., 列: 値}, ...] で返す
+        """
+        passed = features[self.evaluate(features, mask_cache)]
+        if self.sort_by:
+            passed = passed.sort_values(self.sort_by, ascending=not self.descending, kind='stable')
+        if self.limit:
+            passed = passed.head(self.limit)
+
+        # 欠損（NaN / 整数列のNA）は None にしてから丸める
+        out = passed[self.columns].astype(object)
+        out = out.where(out.notna(), None)
+        for col in self.round_columns:
+            out[col] = [round(v, 2) if v is not None else None for v in out[col]]
+        out = out.rename(columns=self.rename)
+        out.index.name = 'ticker'
+        return out.reset_index().to_dict(orient='records')
+
+    def to_dict(self) -> Dict:
+        """設定ファイルと同じ形式の辞書に変換"""
+        config = {'title': self.title, 'criteria': self.criteria, 'columns': self.columns}
+        if self.description:
+            config['description'] = self.description
+        if self.rename:
+            config['rename'] = self.rename
+        if self.round_columns:
+            config['round'] = self.round_columns
+        if self.sort_by:
+            config['sort'] = {'by': self.sort_by, 'descending': self.descending}
+        if self.limit:
+            config['limit'] = self.limit
+        return config
+
+
+def load_screener_definitions(path: Optional[str] = None) -> Dict[str, ScreenerDefinition]:
+    """
+    設定ファイルからスクリーナー定義を読み込み、コンパイルする
+
+    Args:
+        path: JSONファイルのパス（省略時は環境変数 IBD_SCREENERS_CONFIG、なければ同梱の ibd_screeners.json）
+
+    Returns:
+        Dict[str, ScreenerDefinition]: 設定ファイルの順序を保ったスクリーナー名 -> 定義
+    """
+    path = path or os.getenv('IBD_SCREENERS_CONFIG') or DEFAULT_DEFINITIONS_PATH
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return {name: ScreenerDefinition.from_dict(name, entry) for name, entry in config.items()}
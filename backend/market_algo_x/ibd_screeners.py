@@ -4,22 +4,35 @@ IBD Screeners
 データベースに保存された計算済みレーティングを使用してスクリーナーを実行します。
 """
 
+import sqlite3
+
 import numpy as np
+import pandas as pd
 from typing import List, Dict, Optional
 
 # Change import to relative
 from .ibd_database import IBDDatabase
+from .ibd_screener_definitions import load_screener_definitions
 
 
 class IBDScreeners:
     """データベースを使用したIBDスクリーナー"""
 
-    def __init__(self, db_path: str = 'data/ibd_data.db'):
+    # 整数で出力するレーティング列
+    INTEGER_RATING_COLUMNS = ('rs_rating', 'eps_rating', 'comp_rating', 'industry_group_rs')
+
+    def __init__(self, db_path: str = 'data/ibd_data.db', read_only: bool = False,
+                 definitions_path: str = None):
         """
         Args:
             db_path: データベースファイルのパス
+            read_only: 読み取り専用接続で開く（スキーマ初期化を行わない）
+            definitions_path: スクリーナー定義ファイル（省略時は ibd_screeners.json）
         """
-        self.db = IBDDatabase(db_path)
+        self.db = IBDDatabase(db_path, read_only=read_only)
+        self.definitions = load_screener_definitions(definitions_path)
+        self._latest_metrics = None
+        self._features = None
 
     def close(self):
         """リソースをクリーンアップ"""
@@ -27,74 +40,80 @@ class IBDScreeners:
 
     # ==================== ヘルパーメソッド ====================
 
+    def get_latest_metrics(self, ticker: str) -> Optional[Dict]:
+        """
+        latest_metricsテーブルの1行を取得
+
+        初回呼び出し時に全銘柄分を1クエリで読み込み、以降はメモリから返す。
+        """
+        return self._load_latest_metrics().get(ticker)
+
+    def _load_latest_metrics(self) -> Dict[str, Dict]:
+        """全銘柄のlatest_metricsを読み込み（未計算の場合はその場で計算）"""
+        if self._latest_metrics is None:
+            try:
+                self._latest_metrics = self.db.get_all_latest_metrics()
+            except sqlite3.OperationalError:
+                # latest_metricsテーブルがない旧バージョンのDB
+                self._latest_metrics = {}
+            if not self._latest_metrics:
+                # 旧バージョンで作成したDBなど、未計算の場合はその場で計算
+                if self.db.read_only:
+                    metrics = self.db.compute_latest_metrics()
+                    metrics = metrics.astype(object).where(metrics.notna(), None)
+                    self._latest_metrics = metrics.set_index('ticker', drop=False).to_dict(orient='index')
+                else:
+                    self.db.refresh_latest_metrics()
+                    self._latest_metrics = self.db.get_all_latest_metrics()
+        return self._latest_metrics
+
     def get_price_metrics(self, ticker: str) -> Optional[Dict]:
-        """価格関連の指標を計算"""
-        prices_df = self.db.get_price_history(ticker, days=180)
-        if prices_df is None or len(prices_df) < 2:
+        """価格関連の指標を取得"""
+        metrics = self.get_latest_metrics(ticker)
+        if not metrics or metrics['history_days'] < 2:
             return None
 
-        try:
-            close = prices_df['close'].values
-            open_price = prices_df['open'].values
-
-            result = {
-                'price': close[-1],
-                'pct_change_1d': ((close[-1] - close[-2]) / close[-2] * 100) if close[-2] != 0 else 0,
-                'change_from_open': ((close[-1] - open_price[-1]) / open_price[-1] * 100) if open_price[-1] != 0 else 0,
-                'pct_1w': ((close[-1] - close[-6]) / close[-6] * 100) if len(close) >= 6 and close[-6] != 0 else None,
-                'pct_1m': ((close[-1] - close[-21]) / close[-21] * 100) if len(close) >= 21 and close[-21] != 0 else None,
-                'pct_3m': ((close[-1] - close[-63]) / close[-63] * 100) if len(close) >= 63 and close[-63] != 0 else None,
-                'pct_6m': ((close[-1] - close[-126]) / close[-126] * 100) if len(close) >= 126 and close[-126] != 0 else None
-            }
-            return result
-        except Exception as e:
-            return None
+        return {
+            'price': metrics['price'],
+            'pct_change_1d': metrics['pct_change_1d'],
+            'change_from_open': metrics['change_from_open'],
+            'pct_1w': metrics['pct_1w'],
+            'pct_1m': metrics['pct_1m'],
+            'pct_3m': metrics['pct_3m'],
+            'pct_6m': metrics['pct_6m']
+        }
 
     def get_volume_metrics(self, ticker: str) -> Optional[Dict]:
-        """ボリューム関連の指標を計算"""
-        prices_df = self.db.get_price_history(ticker, days=100)
-        if prices_df is None or len(prices_df) < 90:
+        """ボリューム関連の指標を取得（単位: 千株）"""
+        metrics = self.get_latest_metrics(ticker)
+        if not metrics or metrics['history_days'] < 90:
             return None
 
         try:
-            volume = prices_df['volume'].values
-
-            avg_volume_50 = np.mean(volume[-50:]) if len(volume) >= 50 else None
-            avg_volume_90 = np.mean(volume[-90:]) if len(volume) >= 90 else None
-            current_volume = volume[-1]
-
-            vol_change_pct = ((current_volume - avg_volume_50) / avg_volume_50 * 100) if avg_volume_50 and avg_volume_50 > 0 else 0
-            rel_volume = (current_volume / avg_volume_50) if avg_volume_50 and avg_volume_50 > 0 else 0
-
             return {
-                'avg_vol_50': avg_volume_50 / 1000,
-                'avg_vol_90': avg_volume_90 / 1000,
-                'current_volume': current_volume / 1000,
-                'vol_change_pct': vol_change_pct,
-                'rel_volume': rel_volume
+                'avg_vol_50': metrics['avg_vol_50'] / 1000,
+                'avg_vol_90': metrics['avg_vol_90'] / 1000,
+                'current_volume': metrics['current_volume'] / 1000,
+                'vol_change_pct': metrics['vol_change_pct'],
+                'rel_volume': metrics['rel_volume']
             }
-        except Exception as e:
+        except TypeError:
             return None
 
     def get_moving_averages(self, ticker: str) -> Optional[Dict]:
-        """移動平均を計算"""
-        prices_df = self.db.get_price_history(ticker, days=250)
-        if prices_df is None or len(prices_df) < 200:
+        """移動平均を取得"""
+        metrics = self.get_latest_metrics(ticker)
+        if not metrics or metrics['history_days'] < 200:
             return None
 
-        try:
-            close = prices_df['close'].values
-
-            return {
-                '10ma': np.mean(close[-10:]) if len(close) >= 10 else None,
-                '21ma': np.mean(close[-21:]) if len(close) >= 21 else None,
-                '50ma': np.mean(close[-50:]) if len(close) >= 50 else None,
-                '150ma': np.mean(close[-150:]) if len(close) >= 150 else None,
-                '200ma': np.mean(close[-200:]) if len(close) >= 200 else None,
-                'price': close[-1]
-            }
-        except Exception as e:
-            return None
+        return {
+            '10ma': metrics['ma_10'],
+            '21ma': metrics['ma_21'],
+            '50ma': metrics['ma_50'],
+            '150ma': metrics['ma_150'],
+            '200ma': metrics['ma_200'],
+            'price': metrics['price']
+        }
 
     def get_price_vs_50ma(self, ticker: str) -> Optional[float]:
         """価格と50日移動平均の比較"""
@@ -123,7 +142,6 @@ class IBDScreeners:
             return None
 
         # 日付でマージして共通の日付のみを使用（重要：日付の不一致を防ぐ）
-        import pandas as pd
         merged = pd.merge(
             benchmark_prices[['date', 'close']].rename(columns={'close': 'benchmark_close'}),
             target_prices[['date', 'close']].rename(columns={'close': 'target_close'}),
@@ -221,401 +239,107 @@ class IBDScreeners:
         # 52週高値から5%以内
         return rating['price_vs_52w_high'] >= -5
 
-    # ==================== スクリーナー実装 ====================
+    # ==================== 特徴量テーブル ====================
 
-    def screener_momentum_97(self) -> List[Dict]:
+    def get_features(self, refresh: bool = False) -> pd.DataFrame:
         """
-        Momentum 97 スクリーナー
+        全銘柄の特徴量テーブルを取得（初回のみ構築し、以降はキャッシュを返す）
 
-        条件:
-        - 1W Rank (Pct) ≥ 97%
-        - 1M Rank (Pct) ≥ 97%
-        - 3M Rank (Pct) ≥ 97%
+        Args:
+            refresh: キャッシュを破棄して再構築する
         """
-        print("\n=== Momentum 97 スクリーナー実行中 ===")
-
-        tickers_list = self.db.get_all_tickers()
-        performance_data = {}
-
-        # 全銘柄のパフォーマンスを取得
-        for ticker in tickers_list:
-            price_metrics = self.get_price_metrics(ticker)
-            # Ensure we have data for 1W, 1M, and 3M
-            if price_metrics and price_metrics.get('pct_1w') is not None and price_metrics.get('pct_1m') is not None and price_metrics.get('pct_3m') is not None:
-                performance_data[ticker] = {
-                    '1w': price_metrics['pct_1w'],
-                    '1m': price_metrics['pct_1m'],
-                    '3m': price_metrics['pct_3m']
-                }
-
-        # 各期間でパーセンタイルランクを計算
-        def calc_percentile_ranks(values_dict, key):
-            valid = {t: v[key] for t, v in values_dict.items() if v[key] is not None}
-            if not valid:
-                return {}
-            sorted_items = sorted(valid.items(), key=lambda x: x[1])
-            total = len(sorted_items)
-            return {t: ((idx + 1) / total) * 100 for idx, (t, v) in enumerate(sorted_items)}
-
-        rank_1w = calc_percentile_ranks(performance_data, '1w')
-        rank_1m = calc_percentile_ranks(performance_data, '1m')
-        rank_3m = calc_percentile_ranks(performance_data, '3m')
-
-        # フィルタリング
-        passed = []
-        for ticker in performance_data.keys():
-            r1 = rank_1w.get(ticker, 0)
-            r2 = rank_1m.get(ticker, 0)
-            r3 = rank_3m.get(ticker, 0)
-
-            if r1 >= 97 and r2 >= 97 and r3 >= 97:
-                passed.append({
-                    'ticker': ticker,
-                    'momentum_rank_1w': round(r1, 2),
-                    'momentum_rank_1m': round(r2, 2),
-                    'momentum_rank_3m': round(r3, 2)
-                })
+        if self._features is None or refresh:
+            self._features = self.build_features()
+        return self._features
 
-        print(f"  合格: {len(passed)} 銘柄")
-        return passed
-
-    def screener_explosive_eps_growth(self) -> List[Dict]:
+    def build_features(self) -> pd.DataFrame:
         """
-        Explosive Estimated EPS Growth Stocks スクリーナー
+        レーティング・EPS・プロファイルと latest_metrics の価格・出来高・移動平均を
+        tickerをインデックスとする1つのDataFrameにまとめる
 
-        条件:
-        - RS Rating ≥ 80
-        - EPS Est Cur Qtr % ≥ 100% (Proxy: EPS Growth Last Qtr)
-        - 50-Day Avg Vol ≥ 100K
-        - Price vs 50-Day ≥ 0.0%
+        各列の欠損条件は get_price_metrics / get_volume_metrics / get_moving_averages と同じ
+        （履歴日数が足りない銘柄はNaN）で、出来高は千株単位。
         """
-        print("\n=== Explosive Estimated EPS Growth Stocks スクリーナー実行中 ===")
-
-        passed = []
-        all_ratings = self.db.get_all_ratings()
+        features = self.db.get_screening_features().set_index('ticker')
+        # レーティングはREAL列から読むとfloatになるため、整数（欠損はNA）に戻す
+        for col in self.INTEGER_RATING_COLUMNS:
+            features[col] = features[col].round().astype('Int64')
+
+        metric_columns = [c for c in IBDDatabase.LATEST_METRICS_COLUMNS if c not in ('ticker', 'as_of_date')]
+        metrics = pd.DataFrame.from_dict(self._load_latest_metrics(), orient='index')
+        metrics = metrics.reindex(index=features.index, columns=metric_columns)
+        metrics = metrics.apply(pd.to_numeric, errors='coerce')
+
+        history = metrics['history_days']
+        price_ok = history >= 2
+        volume_ok = (history >= 90) & metrics[['avg_vol_50', 'avg_vol_90', 'current_volume']].notna().all(axis=1)
+        ma_ok = history >= 200
+
+        for col in ('price', 'pct_change_1d', 'change_from_open', 'pct_1w', 'pct_1m', 'pct_3m', 'pct_6m'):
+            features[col] = metrics[col].where(price_ok)
+        for col in ('avg_vol_50', 'avg_vol_90', 'current_volume'):
+            features[col] = (metrics[col] / 1000).where(volume_ok)
+        for col in ('vol_change_pct', 'rel_volume'):
+            features[col] = metrics[col].where(volume_ok)
+        for col in ('ma_10', 'ma_21', 'ma_50', 'ma_150', 'ma_200'):
+            features[col] = metrics[col].where(ma_ok)
+
+        ma_50 = features['ma_50'].where(features['ma_50'] != 0)
+        features['price_vs_50ma'] = (features['price'] - ma_50) / ma_50 * 100
+
+        # モメンタムランク: 1W/1M/3Mがすべて揃う銘柄内での順位（同値はticker順）
+        momentum = features[['pct_1w', 'pct_1m', 'pct_3m']].dropna()
+        for period in ('1w', '1m', '3m'):
+            features[f'momentum_rank_{period}'] = momentum[f'pct_{period}'].rank(method='first') / len(momentum) * 100
+
+        features['market_cap_millions'] = features['market_cap'] / 1_000_000
+        # プロファイルのセクターがhealthcare/medical（プロファイルはあるがセクター未設定の場合もTrue）
+        sector = features['sector']
+        healthcare = sector.str.lower().str.contains('healthcare|medical').fillna(False).astype(bool)
+        features['healthcare_sector'] = features['has_profile'] & (sector.isna() | healthcare)
+        return features
 
-        for ticker, rating in all_ratings.items():
-            try:
-                # RS Rating チェック
-                rs_rating = rating['rs_rating']
-                if rs_rating is None or rs_rating < 80:
-                    continue
-
-                # EPS Growth チェック
-                # Note: Using Last Qtr Actual as Proxy for Est Cur Qtr (Limitation)
-                eps_components = self.db.get_all_eps_components()
-                if ticker not in eps_components:
-                    continue
-
-                eps_growth = eps_components[ticker]['eps_growth_last_qtr']
-                if eps_growth is None or eps_growth < 100:
-                    continue
-
-                # ボリュームチェック
-                vol_metrics = self.get_volume_metrics(ticker)
-                if not vol_metrics or vol_metrics['avg_vol_50'] < 100:
-                    continue
-
-                # Price vs 50-Day MA チェック
-                price_vs_50ma = self.get_price_vs_50ma(ticker)
-                if price_vs_50ma is None or price_vs_50ma < 0:
-                    continue
-
-                passed.append({
-                    'ticker': ticker,
-                    'rs_rating': rs_rating,
-                    'eps_growth_last_qtr': eps_growth,
-                    'avg_vol_50': vol_metrics['avg_vol_50'],
-                    'price_vs_50ma': round(price_vs_50ma, 2)
-                })
-            except:
-                continue
-
-        print(f"  合格: {len(passed)} 銘柄")
-        return passed
+    # ==================== スクリーナー実装 ====================
 
-    def screener_up_on_volume(self) -> List[Dict]:
-        """
-        Up on Volume List スクリーナー
-
-        条件:
-        - Price % Chg ≥ 0.00%
-        - Vol% Chg vs 50-Day ≥ 20%
-        - Current Price ≥ $10
-        - 50-Day Avg Vol ≥ 100K
-        - Market Cap ≥ $250M
-        - RS Rating ≥ 80
-        - EPS % Chg Last Qtr ≥ 20%
-        - A/D Rating ABC
+    def run_screener(self, name: str, mask_cache: Dict = None) -> List[Dict]:
         """
-        print("\n=== Up on Volume List スクリーナー実行中 ===")
-
-        passed = []
-        all_ratings = self.db.get_all_ratings()
-
-        for ticker, rating in all_ratings.items():
-            try:
-                # RS Rating チェック
-                rs_rating = rating['rs_rating']
-                if rs_rating is None or rs_rating < 80:
-                    continue
-
-                # A/D Rating チェック
-                if rating['ad_rating'] not in ['A', 'B', 'C']:
-                    continue
-
-                # 価格チェック
-                price_metrics = self.get_price_metrics(ticker)
-                if not price_metrics:
-                    continue
-
-                if price_metrics['pct_change_1d'] < 0:
-                    continue
-
-                if price_metrics['price'] < 10:
-                    continue
-
-                # ボリュームチェック
-                vol_metrics = self.get_volume_metrics(ticker)
-                if not vol_metrics:
-                    continue
-
-                if vol_metrics['avg_vol_50'] < 100:
-                    continue
-
-                if vol_metrics['vol_change_pct'] < 20:
-                    continue
-
-                # 時価総額チェック
-                profile = self.db.get_company_profile(ticker)
-                if not profile or profile['market_cap'] is None:
-                    continue
-
-                market_cap_millions = profile['market_cap'] / 1_000_000
-                if market_cap_millions < 250:
-                    continue
-
-                # EPS成長率チェック
-                eps_components = self.db.get_all_eps_components()
-                if ticker not in eps_components:
-                    continue
-
-                eps_growth = eps_components[ticker]['eps_growth_last_qtr']
-                if eps_growth is None or eps_growth < 20:
-                    continue
-
-                passed.append({
-                    'ticker': ticker,
-                    'price_change_pct': price_metrics['pct_change_1d'],
-                    'vol_change_pct': vol_metrics['vol_change_pct'],
-                    'rs_rating': rs_rating,
-                    'eps_growth_last_qtr': eps_growth
-                })
-            except:
-                continue
+        定義ファイルのスクリーナーを特徴量テーブルに対して実行
 
-        print(f"  合格: {len(passed)} 銘柄")
-        return passed
-
-    def screener_top_2_percent_rs(self) -> List[Dict]:
-        """
-        Top 2% RS Rating List スクリーナー
-
-        条件:
-        - RS Rating ≥ 98
-        - 10Day > 21Day > 50Day
-        - 50-Day Avg Vol ≥ 100K
-        - Volume ≥ 100K
-        - Sector NOT: medical/healthcare
+        Args:
+            name: スクリーナー名（ibd_screeners.json のキー）
+            mask_cache: 同じ条件のマスクをスクリーナー間で共有するための辞書
         """
-        print("\n=== Top 2% RS Rating List スクリーナー実行中 ===")
+        definition = self.definitions[name]
+        print(f"\n=== {definition.title} スクリーナー実行中 ===")
 
-        passed = []
-        all_ratings = self.db.get_all_ratings()
-
-        for ticker, rating in all_ratings.items():
-            try:
-                # RS Rating チェック
-                rs_rating = rating['rs_rating']
-                if rs_rating is None or rs_rating < 98:
-                    continue
-
-                # 移動平均チェック
-                ma_data = self.get_moving_averages(ticker)
-                if not ma_data:
-                    continue
-
-                if not (ma_data['10ma'] > ma_data['21ma'] > ma_data['50ma']):
-                    continue
-
-                # ボリュームチェック
-                vol_metrics = self.get_volume_metrics(ticker)
-                if not vol_metrics:
-                    continue
-
-                if vol_metrics['avg_vol_50'] < 100:
-                    continue
-
-                if vol_metrics['current_volume'] < 100:
-                    continue
-
-                # セクターチェック
-                profile = self.db.get_company_profile(ticker)
-                if profile:
-                    sector = profile.get('sector', '').lower()
-                    if 'healthcare' in sector or 'medical' in sector:
-                        continue
-
-                passed.append({
-                    'ticker': ticker,
-                    'rs_rating': rs_rating
-                })
-            except:
-                continue
+        passed = definition.apply(self.get_features(), mask_cache)
 
         print(f"  合格: {len(passed)} 銘柄")
         return passed
 
-    def screener_4_percent_bullish_yesterday(self) -> List[Dict]:
-        """
-        4% Bullish Yesterday スクリーナー
-
-        条件:
-        - Price ≥ $1
-        - Change > 4%
-        - Market cap > $250M
-        - Volume > 100K
-        - Rel Volume > 1
-        - Change from Open > 0%
-        - Avg Volume 90D > 100K
-        """
-        print("\n=== 4% Bullish Yesterday スクリーナー実行中 ===")
-
-        passed = []
-        tickers_list = self.db.get_all_tickers()
-
-        for ticker in tickers_list:
-            try:
-                # 価格チェック
-                price_metrics = self.get_price_metrics(ticker)
-                if not price_metrics:
-                    continue
-
-                if price_metrics['price'] < 1:
-                    continue
-
-                if price_metrics['pct_change_1d'] <= 4:
-                    continue
-
-                if price_metrics['change_from_open'] <= 0:
-                    continue
-
-                # ボリュームチェック
-                vol_metrics = self.get_volume_metrics(ticker)
-                if not vol_metrics:
-                    continue
-
-                if vol_metrics['current_volume'] <= 100:
-                    continue
-
-                if vol_metrics['rel_volume'] <= 1:
-                    continue
-
-                if vol_metrics['avg_vol_90'] <= 100:
-                    continue
+    def screener_momentum_97(self) -> List[Dict]:
+        """Momentum 97 スクリーナー（1W/1M/3M ランクがすべて97%以上）"""
+        return self.run_screener('momentum_97')
 
-                # 時価総額チェック
-                profile = self.db.get_company_profile(ticker)
-                if not profile or profile['market_cap'] is None:
-                    continue
+    def screener_explosive_eps_growth(self) -> List[Dict]:
+        """Explosive Estimated EPS Growth Stocks スクリーナー"""
+        return self.run_screener('explosive_eps')
 
-                market_cap_millions = profile['market_cap'] / 1_000_000
-                if market_cap_millions <= 250:
-                    continue
+    def screener_up_on_volume(self) -> List[Dict]:
+        """Up on Volume List スクリーナー"""
+        return self.run_screener('up_on_volume')
 
-                passed.append({
-                    'ticker': ticker,
-                    'price_change_pct': price_metrics['pct_change_1d'],
-                    'rel_volume': vol_metrics['rel_volume']
-                })
-            except:
-                continue
+    def screener_top_2_percent_rs(self) -> List[Dict]:
+        """Top 2% RS Rating List スクリーナー"""
+        return self.run_screener('top_2pct_rs')
 
-        print(f"  合格: {len(passed)} 銘柄")
-        return passed
+    def screener_4_percent_bullish_yesterday(self) -> List[Dict]:
+        """4% Bullish Yesterday スクリーナー"""
+        return self.run_screener('bullish_4pct')
 
     def screener_healthy_chart_watchlist(self) -> List[Dict]:
-        """
-        Healthy Chart Watch List スクリーナー
-
-        条件:
-        - 10Day > 21Day > 50Day
-        - 50Day > 150Day > 200Day
-        - RS Line New High
-        - RS Rating ≥ 90
-        - A/D Rating AB
-        - Ind Group RS AB (Rank >= 60)
-        - Comp Rating ≥ 80
-        - 50-Day Avg Vol ≥ 100K
-        """
-        print("\n=== Healthy Chart Watch List スクリーナー実行中 ===")
-
-        passed = []
-        all_ratings = self.db.get_all_ratings()
-
-        for ticker, rating in all_ratings.items():
-            try:
-                # RS Rating チェック
-                rs_rating = rating['rs_rating']
-                if rs_rating is None or rs_rating < 90:
-                    continue
-
-                # Composite Rating チェック
-                comp_rating = rating['comp_rating']
-                if comp_rating is None or comp_rating < 80:
-                    continue
-
-                # A/D Rating チェック
-                if rating['ad_rating'] not in ['A', 'B']:
-                    continue
-
-                # Industry Group RS チェック (A/B -> Top 40% -> Rank >= 60)
-                ind_group_rs = rating.get('industry_group_rs')
-                if ind_group_rs is None or ind_group_rs < 60:
-                    continue
-
-                # 移動平均チェック
-                ma_data = self.get_moving_averages(ticker)
-                if not ma_data:
-                    continue
-
-                if not (ma_data['10ma'] > ma_data['21ma'] > ma_data['50ma']):
-                    continue
-
-                if not (ma_data['50ma'] > ma_data['150ma'] > ma_data['200ma']):
-                    continue
-
-                # RS Line New High チェック
-                if not self.check_rs_line_new_high(ticker):
-                    continue
-
-                # ボリュームチェック
-                vol_metrics = self.get_volume_metrics(ticker)
-                if not vol_metrics or vol_metrics['avg_vol_50'] < 100:
-                    continue
-
-                passed.append({
-                    'ticker': ticker,
-                    'rs_rating': rs_rating,
-                    'comp_rating': comp_rating,
-                    'ad_rating': rating['ad_rating'],
-                    'industry_group_rs': ind_group_rs
-                })
-            except:
-                continue
-
-        print(f"  合格: {len(passed)} 銘柄")
-        return passed
+        """Healthy Chart Watch List スクリーナー"""
+        return self.run_screener('healthy_chart')
 
     # ==================== メイン実行関数 ====================
 
@@ -682,15 +406,16 @@ class IBDScreeners:
             print("\n⚠ 警告: SPYデータが取得できませんでした")
             print("  RS STS%を使用するスクリーナーの結果が制限される可能性があります")
 
-        # 各スクリーナーを実行
-        screener_results = {}
+        # 全銘柄の特徴量を1回だけ読み込み、各スクリーナーはその上の条件として評価
+        print("\n特徴量テーブルを構築中...")
+        features = self.get_features(refresh=True)
+        print(f"  {len(features)} 銘柄")
 
-        screener_results['momentum_97'] = self.screener_momentum_97()
-        screener_results['explosive_eps'] = self.screener_explosive_eps_growth()
-        screener_results['up_on_volume'] = self.screener_up_on_volume()
-        screener_results['top_2pct_rs'] = self.screener_top_2_percent_rs()
-        screener_results['bullish_4pct'] = self.screener_4_percent_bullish_yesterday()
-        screener_results['healthy_chart'] = self.screener_healthy_chart_watchlist()
+        # 定義ファイルの全スクリーナーを実行（共通の条件のマスクは1回だけ計算）
+        screener_results = {}
+        mask_cache = {}
+        for name in self.definitions:
+            screener_results[name] = self.run_screener(name, mask_cache)
 
         print("\n" + "="*80)
         print("すべてのスクリーナー実行完了!")
@@ -7,6 +7,12 @@ IBD Utilities
 import time
 import threading
 
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr, USPresidentsDay,
+    USMemorialDay, USLaborDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
+from pandas.tseries.offsets import CustomBusinessDay
+
 
 class RateLimiter:
     """API rate limit を管理するクラス（マルチスレッド対応）"""
@@ -38,3 +44,25 @@ class RateLimiter:
                     self.request_times = [t for t in self.request_times if current_time - t < 60]
 
             self.request_times.append(current_time)
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """NYSEの休場日（定例の祝日。臨時休場は含まない）"""
+
+    rules = [
+        # 土曜の元日は振替なし（前年12/31の金曜は取引日）
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('IndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+# NYSEの営業日（pd.date_range(freq=...) や Timestamp との加減算に使用）
+NYSE_BDAY = CustomBusinessDay(calendar=NYSEHolidayCalendar())
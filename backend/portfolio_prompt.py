@@ -0,0 +1,211 @@
+"""
+Portfolio Prompt Builder for HanaView
+ポートフォリオ生成用のGeminiプロンプトを、トークン予算内に収まるコンパクトな形式で作成
+"""
+
+import os
+import json
+import math
+import numbers
+from typing import Dict, List, Optional
+
+# プロンプト全体のトークン予算（推定値）
+PORTFOLIO_PROMPT_TOKEN_BUDGET = int(os.getenv("PORTFOLIO_PROMPT_TOKEN_BUDGET", "12000"))
+# 候補銘柄ごとに含める個別解説の最大文字数
+PORTFOLIO_NOTE_CHARS = 120
+
+# 候補銘柄レコードに含めるスクリーナー指標（存在する場合のみ）
+COMPACT_METRICS = [
+    'rs_rating', 'comp_rating', 'ad_rating', 'eps_growth_last_qtr',
+    'price_vs_50ma', 'rel_volume', 'expected_move_30d'
+]
+
+PROMPT_TEMPLATE = """
+あなたはプロのポートフォリオマネージャーです。
+以下の抽出された有望銘柄リスト（候補銘柄）から、リスク許容度の異なる3つのモデルポートフォリオ（Aggressive, Balanced, Defensive）を構築してください。
+また、前回のポートフォリオ構成と比較して、変更点（新規採用、除外、継続）とその理由を解説してください。
+
+【候補銘柄リスト (今回の購入可能銘柄)】
+1行に1銘柄のJSONです。screeners=該当したスクリーナー, held=前回のポートフォリオに含まれる, new=今回新たにスクリーナーに該当, note=個別分析の要約。
+{candidates}
+{omitted}
+【前回のポートフォリオ構成】
+{previous}
+
+【要件】
+1. **Aggressive Portfolio**: ハイリスク・ハイリターン。成長性やモメンタムを重視。
+2. **Balanced Portfolio**: リスクとリターンのバランスを重視。分散投資。
+3. **Defensive Portfolio**: 安定性重視。ボラティリティが低い、またはディフェンシブなセクター。
+
+【制約】
+- ショート（空売り）は絶対に行わず、ロング（買い）のみで構成すること。
+- 各ポートフォリオは最大10銘柄まで（良い銘柄がなければ少なくても可、0でも可）。
+- 各ポートフォリオ内での配分比率（percentage）を決めること（合計100%になるように）。
+- **entry_price** には、候補銘柄リストにある `price` を使用すること。
+- **commentary** には、前回のポートフォリオからの変更理由を記述すること。
+  - 例: 「NVDAを新規採用（モメンタム強）、AAPLは候補から外れたため除外（利確/損切り）」など。
+  - 今回が初回（前回データなし）の場合は、すべての銘柄を新規採用として扱い、選定理由を記述すること。
+- 出力は**必ず以下のJSON形式**のみとすること。Markdownコードブロックは不要。
+
+{{
+  "aggressive": {{
+    "allocations": [
+        {{ "ticker": "AAPL", "percentage": 40, "entry_price": 150.5 }},
+        {{ "ticker": "NVDA", "percentage": 60, "entry_price": 400.0 }}
+    ],
+    "commentary": "ポートフォリオの変更点と選定理由の解説..."
+  }},
+  "balanced": {{
+    "allocations": [ ... ],
+    "commentary": "..."
+  }},
+  "defensive": {{ ... }}
+}}
+"""
+
+NO_PREVIOUS_TEXT = "（データなし：今回は初回構築、または前回データが不足しているため、すべての銘柄を新規採用の候補として扱ってください）"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数の推定（APIを呼ばない概算）
+
+    英数字・記号は約4文字で1トークン、日本語などの非ASCII文字は1文字1トークンとして数える。
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def _round(value, digits: int = 1):
+    """数値を丸める（numpyの型もPythonの数値にする。NaNはNone）"""
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else round(value, digits)
+
+
+def _held_tickers(prev_portfolios: Dict) -> List[str]:
+    tickers = []
+    for portfolio in (prev_portfolios or {}).values():
+        if isinstance(portfolio, dict):
+            for allocation in portfolio.get('allocations') or []:
+                ticker = allocation.get('ticker') if isinstance(allocation, dict) else None
+                if ticker and ticker not in tickers:
+                    tickers.append(ticker)
+    return tickers
+
+
+def compact_previous_portfolios(prev_portfolios: Dict) -> Dict:
+    """前回のポートフォリオから配分だけを残す（解説文は含めない）"""
+    compact = {}
+    for name, portfolio in (prev_portfolios or {}).items():
+        if not isinstance(portfolio, dict):
+            continue
+        compact[name] = [
+            {k: a.get(k) for k in ('ticker', 'percentage', 'entry_price') if a.get(k) is not None}
+            for a in portfolio.get('allocations') or [] if isinstance(a, dict)
+        ]
+    return compact
+
+
+def compact_candidate(item: Dict, screeners: List[str] = None, held: bool = False) -> Dict:
+    """候補銘柄をプロンプト用の小さなレコードに変換"""
+    record = {
+        'ticker': item['ticker'],
+        'price': _round(item.get('price'), 2),
+        'sector': item.get('sector'),
+        'industry': item.get('industry'),
+        'volatility_regime': item.get('volatility_regime'),
+    }
+    for key in COMPACT_METRICS:
+        if item.get(key) is not None:
+            record[key] = _round(item[key])
+    if screeners:
+        record['screeners'] = screeners
+    if held:
+        record['held'] = True
+    if item.get('is_new'):
+        record['new'] = True
+    note = (item.get('gemini_analysis') or '').strip()
+    if note:
+        record['note'] = note if len(note) <= PORTFOLIO_NOTE_CHARS else note[:PORTFOLIO_NOTE_CHARS] + '…'
+    return {k: v for k, v in record.items() if v is not None}
+
+
+def rank_candidates(records: List[Dict]) -> List[Dict]:
+    """
+    候補銘柄を優先度順に並べる
+
+    前回の保有銘柄（継続・除外の判断に必要）、該当スクリーナー数、RS Rating、Composite Rating の順。
+    """
+    def score(indexed):
+        i, r = indexed
+        return (
+            not r.get('held', False),
+            -len(r.get('screeners', [])),
+            -(r.get('rs_rating') or 0),
+            -(r.get('comp_rating') or 0),
+            i,
+        )
+    return [r for _, r in sorted(enumerate(records), key=score)]
+
+
+def build_portfolio_prompt(symbols: List[Dict], prev_portfolios: Optional[Dict] = None,
+                           screener_hits: Optional[Dict[str, List[str]]] = None,
+                           token_budget: int = PORTFOLIO_PROMPT_TOKEN_BUDGET) -> Dict:
+    """
+    トークン予算内に収まるポートフォリオ生成プロンプトを作成
+
+    候補銘柄を優先度順に1行ずつ追加し、予算を超える銘柄は省略する（省略数はプロンプトに明記）。
+
+    Args:
+        symbols: 分析済みの候補銘柄
+        prev_portfolios: 前回のポートフォリオ
+        screener_hits: ticker -> 該当スクリーナー名のリスト
+        token_budget: プロンプト全体のトークン予算（推定値）
+
+    Returns:
+        Dict: prompt, candidates（プロンプトに含めたレコード）, previous（前回構成の要約）,
+              estimated_tokens, included, omitted
+    """
+    held = set(_held_tickers(prev_portfolios))
+    records = rank_candidates([
+        compact_candidate(item, (screener_hits or {}).get(item['ticker']), item['ticker'] in held)
+        for item in symbols
+    ])
+
+    previous = compact_previous_portfolios(prev_portfolios)
+    previous_text = json.dumps(previous, ensure_ascii=False, separators=(',', ':')) if previous else NO_PREVIOUS_TEXT
+
+    # 候補銘柄以外（指示文・前回構成・省略の注記）のトークン数
+    omitted_note = "※ トークン予算の都合で優先度の低い候補 {n} 銘柄は省略しています。\n"
+    used = estimate_tokens(PROMPT_TEMPLATE.format(candidates='', omitted=omitted_note.format(n=len(records)),
+                                                  previous=previous_text))
+
+    lines = []
+    included = []
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        included.append(record)
+        used += cost
+
+    omitted = len(records) - len(included)
+    prompt = PROMPT_TEMPLATE.format(
+        candidates='\n'.join(lines),
+        omitted=omitted_note.format(n=omitted) if omitted else '',
+        previous=previous_text
+    )
+    return {
+        'prompt': prompt,
+        'candidates': included,
+        'previous': previous,
+        'estimated_tokens': estimate_tokens(prompt),
+        'included': len(included),
+        'omitted': omitted,
+    }
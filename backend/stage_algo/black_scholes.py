@@ -0,0 +1,102 @@
+"""
+Vectorized Black-Scholes
+
+ヨーロピアンオプションの価格・グリークスを numpy 配列でまとめて計算します。
+QuantLib の AnalyticEuropeanEngine（BlackScholesMertonProcess、フラットな金利・配当・
+ボラティリティ、Actual365Fixed）と同じ式で、1年分の日次系列や全ストライクを
+1回の配列演算で評価できます。QuantLib の評価日（ql.Settings）を変更しないため
+スレッドセーフです。アメリカン・エキゾチックは引き続き QuantLib を使用してください。
+
+時間 t は年数（Actual365Fixed なら 日数 / 365）。入力はスカラーと配列を混在できます。
+vol または t が 0 以下・NaN の要素は NaN を返します。
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+
+def _valid(t, vol):
+    t = np.asarray(t, dtype=float)
+    vol = np.asarray(vol, dtype=float)
+    return (t > 0) & (vol > 0)
+
+
+def d1_d2(spot, strike, t, rate, div, vol):
+    """d1, d2 を返す（無効な要素は NaN）"""
+    spot, strike, t, vol = (np.asarray(x, dtype=float) for x in (spot, strike, t, vol))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std_dev = vol * np.sqrt(t)
+        d1 = (np.log(spot / strike) + (rate - div + 0.5 * vol * vol) * t) / std_dev
+    valid = _valid(t, vol)
+    d1 = np.where(valid, d1, np.nan)
+    return d1, d1 - np.where(valid, std_dev, np.nan)
+
+
+def price(option_type: str, spot, strike, t, rate, div, vol):
+    """
+    コール・プットの理論価格
+
+    Args:
+        option_type: 'call' または 'put'
+    """
+    d1, d2 = d1_d2(spot, strike, t, rate, div, vol)
+    df_r = np.exp(-rate * np.asarray(t, dtype=float))
+    df_q = np.exp(-div * np.asarray(t, dtype=float))
+    if option_type == 'call':
+        return spot * df_q * ndtr(d1) - strike * df_r * ndtr(d2)
+    if option_type == 'put':
+        return strike * df_r * ndtr(-d2) - spot * df_q * ndtr(-d1)
+    raise ValueError(f"option_type は 'call' または 'put' を指定してください: {option_type}")
+
+
+def gamma(spot, strike, t, rate, div, vol):
+    """ガンマ（コール・プット共通）"""
+    spot, t, vol = (np.asarray(x, dtype=float) for x in (spot, t, vol))
+    d1, _ = d1_d2(spot, strike, t, rate, div, vol)
+    pdf = np.exp(-0.5 * d1 * d1) / np.sqrt(2 * np.pi)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.exp(-div * t) * pdf / (spot * vol * np.sqrt(t))
+
+
+def digital_probability(option_type: str, spot, strike, t, rate, div, vol):
+    """
+    満期に行使価格を上回る（'call'）／下回る（'put'）リスク中立確率（0〜1）
+
+    キャッシュ・オア・ナッシングの NPV を exp(rT) で割り戻した値と同じ。
+    """
+    _, d2 = d1_d2(spot, strike, t, rate, div, vol)
+    if option_type == 'call':
+        return ndtr(d2)
+    if option_type == 'put':
+        return ndtr(-d2)
+    raise ValueError(f"option_type は 'call' または 'put' を指定してください: {option_type}")
+
+
+def historical_risk_metrics(close: pd.Series, vol: pd.Series, rate: float, div: float = 0.0,
+                            days: int = 30, move_pct: float = 0.10) -> pd.DataFrame:
+    """
+    日次の株価・ボラティリティ系列から理論的なリスク指標を一括計算
+
+    Args:
+        close: 終値
+        vol: 年率ボラティリティ（小数、例: 0.30）
+        rate: 無リスク金利
+        div: 配当利回り
+        days: 満期までの日数
+        move_pct: 確率を求める変動幅
+
+    Returns:
+        pd.DataFrame: Expected_Move_30d_Pct（ATMストラドル / 株価 %）,
+                      Prob_Down_10pct, Prob_Up_10pct（%）
+    """
+    spot = close.to_numpy(dtype=float)
+    sigma = vol.to_numpy(dtype=float)
+    t = days / 365.0
+
+    straddle = price('call', spot, spot, t, rate, div, sigma) + price('put', spot, spot, t, rate, div, sigma)
+    return pd.DataFrame({
+        'Expected_Move_30d_Pct': straddle / spot * 100,
+        'Prob_Down_10pct': digital_probability('put', spot, spot * (1 - move_pct), t, rate, div, sigma) * 100,
+        'Prob_Up_10pct': digital_probability('call', spot, spot * (1 + move_pct), t, rate, div, sigma) * 100,
+    }, index=close.index)
@@ -0,0 +1,190 @@
+"""
+Gamma exposure (GEX)
+
+オプションチェーンのストライク別ガンマエクスポージャーを配列演算で計算します。
+コールとプットの建玉をストライクで1回だけ集計し、全ストライクのガンマを
+black_scholes.gamma でまとめて求めます。
+
+GEX の符号は StageAlgo の既存の定義に合わせ、(プット建玉 - コール建玉) × ガンマ です。
+
+複数満期モードでは直近 N 満期のチェーンを1つの表に連結し、満期ごとの残存期間・
+ボラティリティで全行のガンマを1回で計算して、満期の重みを掛けてストライク別に集計します。
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import black_scholes
+
+
+def gex_profile(calls: pd.DataFrame, puts: pd.DataFrame, spot: float, t: float,
+                rate: float, div: float, vol: float) -> pd.DataFrame:
+    """
+    ストライク別のGEXプロファイル
+
+    Args:
+        calls, puts: yfinance のオプションチェーン（strike, openInterest 列）
+        spot: 現在の株価
+        t: 満期までの年数
+        rate, div, vol: 無リスク金利・配当利回り・ボラティリティ（全ストライク共通）
+
+    Returns:
+        pd.DataFrame: ストライク昇順のインデックスと call_oi, put_oi, gamma, net_gex 列
+    """
+    profile = pd.concat([
+        calls.groupby('strike')['openInterest'].sum().rename('call_oi'),
+        puts.groupby('strike')['openInterest'].sum().rename('put_oi'),
+    ], axis=1).fillna(0).sort_index()
+    profile.index.name = 'strike'
+
+    strikes = profile.index.to_numpy(dtype=float)
+    # 計算できないストライク（満期当日など）のガンマは0として扱う
+    gamma = np.nan_to_num(black_scholes.gamma(spot, strikes, t, rate, div, vol), nan=0.0, posinf=0.0, neginf=0.0)
+    profile['gamma'] = gamma
+    profile['net_gex'] = profile['put_oi'].to_numpy(dtype=float) * gamma - profile['call_oi'].to_numpy(dtype=float) * gamma
+    return profile
+
+
+def sign_changes(values) -> np.ndarray:
+    """values[i] と values[i+1] の符号が反転する（0を挟まない）位置 i の配列"""
+    values = np.asarray(values, dtype=float)
+    a, b = values[:-1], values[1:]
+    return np.flatnonzero(((a > 0) & (b < 0)) | ((a < 0) & (b > 0)))
+
+
+def flip_level(strikes, i: int) -> float:
+    """符号反転位置 i のゼロガンマ水準（隣接ストライクの中点）"""
+    return (strikes[i] + strikes[i + 1]) / 2
+
+
+def nearest_flip(strikes, net_gex, spot: float) -> Optional[float]:
+    """株価の左右それぞれで最も近いゼロガンマ水準のうち、株価に近い方"""
+    strikes = np.asarray(strikes, dtype=float)
+    current_idx = np.searchsorted(strikes, spot)
+    flips = sign_changes(net_gex)
+
+    # 左側は従来どおり先頭の区間（i=0）を含めない
+    left = flips[(flips >= 1) & (flips <= current_idx - 1)]
+    left_flip = flip_level(strikes, left[-1]) if len(left) else None
+
+    right = flips[flips >= current_idx]
+    right_flip = flip_level(strikes, right[0]) if len(right) else None
+
+    if left_flip and right_flip:
+        return left_flip if abs(spot - left_flip) < abs(spot - right_flip) else right_flip
+    return left_flip or right_flip
+
+
+def first_flip_near(strikes, net_gex, spot: float, max_distance_pct: float = 0.2) -> Optional[float]:
+    """ストライクの低い方から見て、株価から max_distance_pct 以内で最初のゼロガンマ水準"""
+    strikes = np.asarray(strikes, dtype=float)
+    flips = sign_changes(net_gex)
+    near = flips[np.abs(strikes[flips] - spot) < spot * max_distance_pct]
+    if len(near) == 0:
+        return None
+    return flip_level(strikes, near[0])
+
+
+# ==================== 複数満期 ====================
+
+def load_option_chains(stock, n_expiries: int) -> List[Tuple[date, pd.DataFrame, pd.DataFrame]]:
+    """
+    直近 n_expiries 満期のオプションチェーンを取得（取得できない満期は除外）
+
+    Args:
+        stock: MarketDataBundle または yf.Ticker
+    """
+    chains = []
+    for expiry_str in list(stock.options or ())[:n_expiries]:
+        try:
+            chain = stock.option_chain(expiry_str)
+        except Exception:
+            continue
+        if chain.calls.empty and chain.puts.empty:
+            continue
+        chains.append((datetime.strptime(expiry_str, "%Y-%m-%d").date(), chain.calls, chain.puts))
+    return chains
+
+
+def _atm_iv(calls: pd.DataFrame, spot: float) -> Optional[float]:
+    """ATMコールのインプライドボラティリティ（不正な値はNone）"""
+    if calls.empty or 'impliedVolatility' not in calls:
+        return None
+    iv = calls['impliedVolatility'].to_numpy(dtype=float)[np.argmin(np.abs(calls['strike'].to_numpy(dtype=float) - spot))]
+    return iv if iv >= 0.01 else None
+
+
+def multi_expiry_profile(chains: List[Tuple[date, pd.DataFrame, pd.DataFrame]], spot: float, as_of: date,
+                         rate: float, div: float, fallback_vol: float) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    複数満期を時間加重で集計したGEXプロファイル
+
+    満期ごとのボラティリティはATMコールのIV（不正な場合は fallback_vol）。
+    近い満期ほど重く、重みは 1/√(残存日数) を合計1に正規化したもの。
+    当日満期以前のチェーンは除外する。
+
+    Returns:
+        (pd.DataFrame, List[Dict]): ストライク昇順の call_oi, put_oi, net_gex と、
+                                    使用した満期（expiry, days, iv, weight）の一覧
+    """
+    frames = []
+    expiries = []
+    for expiry, calls, puts in chains:
+        days = (expiry - as_of).days
+        if days <= 0:
+            continue
+        iv = _atm_iv(calls, spot) or fallback_vol
+        expiries.append({'expiry': expiry.isoformat(), 'days': days, 'iv': iv, 'weight': 1 / np.sqrt(days)})
+        for side, sign, chain in (('call', -1.0, calls), ('put', 1.0, puts)):
+            if chain.empty:
+                continue
+            frames.append(pd.DataFrame({
+                'strike': chain['strike'].to_numpy(dtype=float),
+                'oi': chain['openInterest'].fillna(0).to_numpy(dtype=float),
+                'side': side,
+                'sign': sign,
+                't': days / 365.0,
+                'vol': iv,
+                'weight': expiries[-1]['weight'],
+            }))
+
+    if not frames:
+        return pd.DataFrame(columns=['call_oi', 'put_oi', 'net_gex'], index=pd.Index([], name='strike')), []
+
+    total_weight = sum(e['weight'] for e in expiries)
+    for e in expiries:
+        e['weight'] = e['weight'] / total_weight
+
+    rows = pd.concat(frames, ignore_index=True)
+    rows = rows[rows['strike'].notna()]
+    gamma = np.nan_to_num(black_scholes.gamma(spot, rows['strike'].to_numpy(), rows['t'].to_numpy(), rate, div,
+                                              rows['vol'].to_numpy()), nan=0.0, posinf=0.0, neginf=0.0)
+    rows['net_gex'] = rows['sign'] * rows['oi'] * gamma * rows['weight'] / total_weight
+    rows['call_oi'] = rows['oi'].where(rows['side'] == 'call', 0.0)
+    rows['put_oi'] = rows['oi'].where(rows['side'] == 'put', 0.0)
+
+    profile = rows.groupby('strike')[['call_oi', 'put_oi', 'net_gex']].sum().sort_index()
+    return profile, expiries
+
+
+def summarize_profile(profile: pd.DataFrame, spot: float) -> Dict:
+    """GEXプロファイルの主要水準（QuantLibAnalyzer の Gamma_Analysis と同じ項目）"""
+    if profile.empty:
+        return {
+            "Zero_Gamma_Level": None,
+            "Max_Positive_GEX_Strike": None,
+            "Max_Negative_GEX_Strike": None,
+            "GEX_Profile": "N/A",
+        }
+    strikes = profile.index.to_numpy(dtype=float)
+    gex_vals = profile['net_gex'].to_numpy(dtype=float)
+    flip_price = nearest_flip(strikes, gex_vals, spot)
+    return {
+        "Zero_Gamma_Level": flip_price if flip_price else "None detected nearby",
+        "Max_Positive_GEX_Strike": strikes[np.argmax(gex_vals)],
+        "Max_Negative_GEX_Strike": strikes[np.argmin(gex_vals)],
+        "GEX_Profile": "Positive (Stabilizing)" if gex_vals.sum() > 0 else "Negative (Volatile/Accelerator)",
+    }
@@ -8,12 +8,16 @@ import math
 from datetime import datetime, timedelta
 import argparse
 
+from . import black_scholes, gamma_exposure
+
 # Setup Plotting Style
 plt.style.use('ggplot')
 
 class GammaPlotter:
-    def __init__(self, ticker):
+    def __init__(self, ticker, bundle=None):
+        """bundle: 共有の MarketDataBundle（省略時は yf.Ticker から直接取得）"""
         self.ticker = ticker
+        self.bundle = bundle
         self.risk_free_rate = 0.045
         self.day_count = ql.Actual365Fixed()
         self.calendar = ql.UnitedStates(ql.UnitedStates.NYSE)
@@ -26,7 +30,7 @@ class GammaPlotter:
     def fetch_data(self):
         """Fetch stock data and option chain."""
         try:
-            self.stock = yf.Ticker(self.ticker)
+            self.stock = self.bundle if self.bundle is not None else yf.Ticker(self.ticker)
             self.hist = self.stock.history(period="1y")
             if self.hist.empty:
                 return False
@@ -73,53 +77,20 @@ class GammaPlotter:
         iv_current = atm_call['impliedVolatility']
         if iv_current < 0.01: iv_current = 0.5 # Fallback
 
-        # GEX Calc
-        ql_expiry = ql.Date(self.expiry_date.day, self.expiry_date.month, self.expiry_date.year)
-        spot_handle = ql.QuoteHandle(ql.SimpleQuote(self.current_price))
-        rate_handle = ql.YieldTermStructureHandle(ql.FlatForward(self.evaluation_date, self.risk_free_rate, self.day_count))
-        div_handle = ql.YieldTermStructureHandle(ql.FlatForward(self.evaluation_date, self.dividend_yield, self.day_count))
-        vol_handle = ql.BlackVolTermStructureHandle(ql.BlackConstantVol(self.evaluation_date, self.calendar, iv_current, self.day_count))
-
-        bs_process = ql.BlackScholesMertonProcess(spot_handle, div_handle, rate_handle, vol_handle)
-        engine = ql.AnalyticEuropeanEngine(bs_process)
-        exercise = ql.EuropeanExercise(ql_expiry)
-
-        gex_by_strike = {}
-        all_strikes = sorted(list(set(calls['strike']).union(set(puts['strike']))))
-
-        for k in all_strikes:
-            call_oi = calls[calls['strike'] == k]['openInterest'].sum()
-            put_oi = puts[puts['strike'] == k]['openInterest'].sum()
-
-            payoff = ql.PlainVanillaPayoff(ql.Option.Call, k)
-            option = ql.VanillaOption(payoff, exercise)
-            option.setPricingEngine(engine)
-            try:
-                gamma = option.gamma()
-            except:
-                gamma = 0
-
-            net_gex = (put_oi * gamma) - (call_oi * gamma)
-            gex_by_strike[k] = net_gex
+        # GEX Calc (all strikes in one pass)
+        t = (self.expiry_date - self.current_date).days / 365.0
+        profile = gamma_exposure.gex_profile(calls, puts, self.current_price, t,
+                                             self.risk_free_rate, self.dividend_yield, iv_current)
+        if profile.empty: return
 
-        strikes = sorted(gex_by_strike.keys())
-        gex_vals = [gex_by_strike[k] for k in strikes]
-
-        if not gex_vals: return
+        strikes = profile.index.to_numpy()
+        gex_vals = profile['net_gex'].to_numpy()
 
         self.gamma_magnet = strikes[np.argmax(gex_vals)]
         self.gamma_accel = strikes[np.argmin(gex_vals)]
 
-        # Zero Gamma Flip
-        flip_price = None
-        current_idx = np.searchsorted(strikes, self.current_price)
-
-        # Scan for flip
-        for i in range(len(strikes)-1):
-             if (gex_vals[i] > 0 and gex_vals[i+1] < 0) or (gex_vals[i] < 0 and gex_vals[i+1] > 0):
-                 if abs(strikes[i] - self.current_price) < self.current_price * 0.2: # Only near money
-                     flip_price = (strikes[i] + strikes[i+1]) / 2
-                     break
+        # Zero Gamma Flip: first sign change near the money
+        flip_price = gamma_exposure.first_flip_near(strikes, gex_vals, self.current_price, 0.2)
 
         self.gamma_flip = flip_price
         # print(f"Gamma Levels: Flip={self.gamma_flip}, Magnet={self.gamma_magnet}, Accel={self.gamma_accel}")
@@ -130,64 +101,11 @@ class GammaPlotter:
         # CORRECTED: Keep HV as decimal (0.30), NOT percentage (30.0)
         self.hist['HV_20d'] = self.hist['LogReturn'].rolling(window=20).std() * np.sqrt(252)
 
-        expected_moves_pct = []
-        downside_probs = []
-        upside_probs = []
-
-        for date_idx, row in self.hist.iterrows():
-            price = row['Close']
-            vol = row['HV_20d']
-
-            if pd.isna(vol) or vol == 0:
-                expected_moves_pct.append(np.nan)
-                downside_probs.append(np.nan)
-                upside_probs.append(np.nan)
-                continue
-
-            ql_date = ql.Date(date_idx.day, date_idx.month, date_idx.year)
-            ql.Settings.instance().evaluationDate = ql_date
-            expiry_date = ql_date + 30
-
-            spot_handle = ql.QuoteHandle(ql.SimpleQuote(price))
-            rate_handle = ql.YieldTermStructureHandle(ql.FlatForward(ql_date, self.risk_free_rate, self.day_count))
-            div_handle = ql.YieldTermStructureHandle(ql.FlatForward(ql_date, self.dividend_yield, self.day_count))
-            # Pass decimal vol (e.g., 0.30)
-            vol_handle = ql.BlackVolTermStructureHandle(ql.BlackConstantVol(ql_date, self.calendar, vol, self.day_count))
-            bs_process = ql.BlackScholesMertonProcess(spot_handle, div_handle, rate_handle, vol_handle)
-            engine = ql.AnalyticEuropeanEngine(bs_process)
-            exercise = ql.EuropeanExercise(expiry_date)
-
-            # Straddle for Expected Move %
-            c_payoff = ql.PlainVanillaPayoff(ql.Option.Call, price)
-            c_opt = ql.VanillaOption(c_payoff, exercise)
-            c_opt.setPricingEngine(engine)
-            p_payoff = ql.PlainVanillaPayoff(ql.Option.Put, price)
-            p_opt = ql.VanillaOption(p_payoff, exercise)
-            p_opt.setPricingEngine(engine)
-
-            straddle_val = c_opt.NPV() + p_opt.NPV()
-            expected_moves_pct.append((straddle_val / price) * 100)
-
-            # Skew Probs
-            target_down = price * 0.90
-            bin_payoff_down = ql.CashOrNothingPayoff(ql.Option.Put, target_down, 1.0)
-            bin_opt_down = ql.VanillaOption(bin_payoff_down, exercise)
-            bin_opt_down.setPricingEngine(engine)
-
-            target_up = price * 1.10
-            bin_payoff_up = ql.CashOrNothingPayoff(ql.Option.Call, target_up, 1.0)
-            bin_opt_up = ql.VanillaOption(bin_payoff_up, exercise)
-            bin_opt_up.setPricingEngine(engine)
-
-            time_to_expiry = self.day_count.yearFraction(ql_date, expiry_date)
-            disc = math.exp(self.risk_free_rate * time_to_expiry)
-
-            downside_probs.append(bin_opt_down.NPV() * disc * 100)
-            upside_probs.append(bin_opt_up.NPV() * disc * 100)
-
-        self.hist['Expected_Move_30d_Pct'] = expected_moves_pct
-        self.hist['Prob_Down_10pct'] = downside_probs
-        self.hist['Prob_Up_10pct'] = upside_probs
+        # 30-day ATM straddle and ±10% digital probabilities for every day in one array pass
+        metrics = black_scholes.historical_risk_metrics(
+            self.hist['Close'], self.hist['HV_20d'], self.risk_free_rate, self.dividend_yield)
+        for col in metrics.columns:
+            self.hist[col] = metrics[col]
 
     def plot_analysis(self, output_dir='.'):
         plt.close('all')
@@ -0,0 +1,132 @@
+"""
+Market data bundle
+
+GammaPlotter / QuantLibAnalyzer / TimeSeriesQuantLibAnalyzer が同じ銘柄について
+それぞれ yfinance に問い合わせていた株価履歴・info・オプションチェーンを、
+1回だけ取得して共有します。yf.Ticker と同じインターフェース（history / info /
+options / option_chain）を持つため、各アナライザーは self.stock として使えます。
+取得したデータは呼び出しごとにコピーを返すので、アナライザー側で列を追加しても
+他のアナライザーには影響しません。
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts', 'underlying'])
+
+
+class MarketDataBundle:
+    """1銘柄分のyfinanceデータを遅延取得してキャッシュする"""
+
+    def __init__(self, ticker: str, period: str = '1y'):
+        """
+        Args:
+            ticker: ティッカーシンボル
+            period: 株価履歴の取得期間
+        """
+        self.ticker = ticker
+        self.period = period
+        self._ticker = None
+        self._lock = threading.RLock()
+        # キー -> (値, 例外)。取得に失敗した場合も例外をキャッシュし、再リクエストしない
+        self._cache: Dict[tuple, Tuple[object, Optional[Exception]]] = {}
+
+    @property
+    def yf_ticker(self) -> yf.Ticker:
+        if self._ticker is None:
+            self._ticker = yf.Ticker(self.ticker)
+        return self._ticker
+
+    def _fetch(self, key: tuple, loader):
+        with self._lock:
+            if key not in self._cache:
+                try:
+                    self._cache[key] = (loader(), None)
+                except Exception as e:
+                    self._cache[key] = (None, e)
+            value, error = self._cache[key]
+        if error is not None:
+            raise error
+        return value
+
+    def history(self, period: str = None, **kwargs) -> pd.DataFrame:
+        """株価履歴（yf.Ticker.history と同じ。取得は期間ごとに1回）"""
+        period = period or self.period
+        key = ('history', period, tuple(sorted(kwargs.items())))
+        return self._fetch(key, lambda: self.yf_ticker.history(period=period, **kwargs)).copy()
+
+    @property
+    def info(self) -> Dict:
+        return copy.deepcopy(self._fetch(('info',), lambda: self.yf_ticker.info))
+
+    @property
+    def options(self) -> tuple:
+        return tuple(self._fetch(('options',), lambda: self.yf_ticker.options))
+
+    def option_chain(self, expiry: str = None) -> OptionChain:
+        """オプションチェーン（満期ごとに1回だけ取得）"""
+        chain = self._fetch(('option_chain', expiry), lambda: self.yf_ticker.option_chain(expiry))
+        return OptionChain(chain.calls.copy(), chain.puts.copy(), copy.deepcopy(getattr(chain, 'underlying', None)))
+
+    def memoize(self, key: tuple, builder):
+        """
+        バンドルのデータから計算した派生値をキャッシュ（例: 複数満期のGEXプロファイル）
+
+        同じキーの2回目以降は builder を呼ばずに同じ結果を返すため、呼び出し側で変更しないこと。
+        """
+        return self._fetch(('derived',) + tuple(key), builder)
+
+    @property
+    def as_of(self) -> Optional[date]:
+        """株価履歴の最終日（取得前・取得失敗時はNone）"""
+        cached = self._cache.get(('history', self.period, ()))
+        if not cached or cached[0] is None or cached[0].empty:
+            return None
+        return cached[0].index[-1].date()
+
+
+class MarketDataBundleCache:
+    """
+    (ティッカー, 日付) をキーにバンドルを保持するキャッシュ
+
+    同じ実行の中で同じ銘柄を再分析する場合に再取得を避ける。
+    件数と有効期限で古いバンドルを破棄する。
+    """
+
+    def __init__(self, max_entries: int = 16, ttl_sec: float = 900):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._bundles: 'OrderedDict[tuple, Tuple[MarketDataBundle, float]]' = OrderedDict()
+
+    def get(self, ticker: str, as_of: date = None) -> MarketDataBundle:
+        """バンドルを取得（なければ作成）"""
+        key = (ticker.upper(), (as_of or date.today()).isoformat())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._bundles.get(key)
+            if entry is not None and now - entry[1] < self.ttl_sec:
+                self._bundles.move_to_end(key)
+                return entry[0]
+            bundle = MarketDataBundle(ticker)
+            self._bundles[key] = (bundle, now)
+            self._bundles.move_to_end(key)
+            while len(self._bundles) > self.max_entries:
+                self._bundles.popitem(last=False)
+            return bundle
+
+    def clear(self):
+        with self._lock:
+            self._bundles.clear()
+
+
+# プロセス内で共有するキャッシュ
+bundle_cache = MarketDataBundleCache()
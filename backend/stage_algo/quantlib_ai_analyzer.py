@@ -8,17 +8,23 @@ import math
 from datetime import datetime, timedelta
 import argparse
 
+from . import gamma_exposure
+
 class QuantLibAnalyzer:
-    def __init__(self, ticker):
+    def __init__(self, ticker, bundle=None):
+        """bundle: 共有の MarketDataBundle（省略時は yf.Ticker から直接取得）"""
         self.ticker = ticker
+        self.bundle = bundle
         self.risk_free_rate = 0.045
         self.day_count = ql.Actual365Fixed()
         self.calendar = ql.UnitedStates(ql.UnitedStates.NYSE)
+        self.multi_expiry_count = 4
+        self.multi_expiry_profile = None
 
     def fetch_data(self):
         """Fetch stock data using yfinance."""
         try:
-            self.stock = yf.Ticker(self.ticker)
+            self.stock = self.bundle if self.bundle is not None else yf.Ticker(self.ticker)
             self.hist = self.stock.history(period="1y")
             if self.hist.empty:
                 return False
@@ -123,85 +129,59 @@ class QuantLibAnalyzer:
         # 2. Calculate Gamma Profile (GEX)
         if not puts.empty:
             self.calculate_gex(calls, puts)
+        self.calculate_multi_expiry_gex()
 
         # 3. Calculate Probabilities using the determined IV
         self.calculate_probabilities()
 
     def calculate_gex(self, calls, puts):
         """Calculate Net Gamma Exposure per strike."""
-        # Setup QuantLib Engine
-        ql_expiry = ql.Date(self.expiry_date.day, self.expiry_date.month, self.expiry_date.year)
-        spot_handle = ql.QuoteHandle(ql.SimpleQuote(self.current_price))
-        rate_handle = ql.YieldTermStructureHandle(ql.FlatForward(self.evaluation_date, self.risk_free_rate, self.day_count))
-        div_handle = ql.YieldTermStructureHandle(ql.FlatForward(self.evaluation_date, self.dividend_yield, self.day_count))
-        vol_handle = ql.BlackVolTermStructureHandle(ql.BlackConstantVol(self.evaluation_date, self.calendar, self.iv_current, self.day_count))
-
-        bs_process = ql.BlackScholesMertonProcess(spot_handle, div_handle, rate_handle, vol_handle)
-        engine = ql.AnalyticEuropeanEngine(bs_process)
-        exercise = ql.EuropeanExercise(ql_expiry)
-
-        gex_by_strike = {}
-        all_strikes = sorted(list(set(calls['strike']).union(set(puts['strike']))))
-
-        for k in all_strikes:
-            # Get OI
-            call_oi = calls[calls['strike'] == k]['openInterest'].sum()
-            put_oi = puts[puts['strike'] == k]['openInterest'].sum()
-
-            # Gamma Calc
-            payoff = ql.PlainVanillaPayoff(ql.Option.Call, k)
-            option = ql.VanillaOption(payoff, exercise)
-            option.setPricingEngine(engine)
-            try:
-                gamma = option.gamma()
-            except:
-                gamma = 0
-
-            net_gex = (put_oi * gamma) - (call_oi * gamma)
-            gex_by_strike[k] = net_gex
+        t = (self.expiry_date - self.current_date).days / 365.0
+        profile = gamma_exposure.gex_profile(calls, puts, self.current_price, t,
+                                             self.risk_free_rate, self.dividend_yield, self.iv_current)
 
         # Find Key Levels
-        strikes = sorted(gex_by_strike.keys())
-        gex_vals = [gex_by_strike[k] for k in strikes]
+        strikes = profile.index.to_numpy()
+        gex_vals = profile['net_gex'].to_numpy()
 
-        if not gex_vals: return
+        if not len(gex_vals): return
 
         self.gamma_data["Max_Positive_GEX_Strike"] = strikes[np.argmax(gex_vals)] # Resistance/Pin
         self.gamma_data["Max_Negative_GEX_Strike"] = strikes[np.argmin(gex_vals)] # Acceleration Zone
 
-        # Zero Gamma Flip
-        # Find where sign changes
-        flip_price = None
-        current_idx = np.searchsorted(strikes, self.current_price)
-
-        # Look left and right for nearest flip
-        left_flip = None
-        for i in range(current_idx-1, 0, -1):
-             if (gex_vals[i] > 0 and gex_vals[i+1] < 0) or (gex_vals[i] < 0 and gex_vals[i+1] > 0):
-                 left_flip = (strikes[i] + strikes[i+1]) / 2
-                 break
-
-        right_flip = None
-        for i in range(current_idx, len(strikes)-1):
-             if (gex_vals[i] > 0 and gex_vals[i+1] < 0) or (gex_vals[i] < 0 and gex_vals[i+1] > 0):
-                 right_flip = (strikes[i] + strikes[i+1]) / 2
-                 break
-
-        if left_flip and right_flip:
-            flip_price = left_flip if abs(self.current_price - left_flip) < abs(self.current_price - right_flip) else right_flip
-        elif left_flip:
-            flip_price = left_flip
-        elif right_flip:
-            flip_price = right_flip
+        # Zero Gamma Flip (nearest sign change on either side of the spot)
+        flip_price = gamma_exposure.nearest_flip(strikes, gex_vals, self.current_price)
 
         self.gamma_data["Zero_Gamma_Level"] = flip_price if flip_price else "None detected nearby"
 
-        total_gex = sum(gex_vals)
+        total_gex = gex_vals.sum()
         if total_gex > 0:
             self.gamma_data["GEX_Profile"] = "Positive (Stabilizing)"
         else:
             self.gamma_data["GEX_Profile"] = "Negative (Volatile/Accelerator)"
 
+    def calculate_multi_expiry_gex(self, n_expiries=None):
+        """Time-weighted GEX aggregated over the next N expiries (cached on the bundle)."""
+        n_expiries = n_expiries or self.multi_expiry_count
+
+        def build():
+            chains = gamma_exposure.load_option_chains(self.stock, n_expiries)
+            return gamma_exposure.multi_expiry_profile(chains, self.current_price, self.current_date,
+                                                       self.risk_free_rate, self.dividend_yield, self.iv_current)
+
+        key = ('multi_expiry_gex', n_expiries, self.risk_free_rate, self.dividend_yield, self.iv_current)
+        if self.bundle is not None:
+            profile, expiries = self.bundle.memoize(key, build)
+        else:
+            profile, expiries = build()
+
+        self.multi_expiry_profile = profile
+        if not expiries:
+            return
+        summary = gamma_exposure.summarize_profile(profile, self.current_price)
+        summary["Expiries"] = [e['expiry'] for e in expiries]
+        self.gamma_data["Multi_Expiry"] = summary
+
     def calculate_probabilities(self):
         # ... (Same as before, using self.iv_current)
         ql_expiry = ql.Date(self.expiry_date.day, self.expiry_date.month, self.expiry_date.year)
@@ -7,12 +7,16 @@ import matplotlib.pyplot as plt
 import math
 from datetime import timedelta
 
+from . import black_scholes
+
 # Setup Plotting Style
 plt.style.use('ggplot')
 
 class TimeSeriesQuantLibAnalyzer:
-    def __init__(self, ticker):
+    def __init__(self, ticker, bundle=None):
+        """bundle: 共有の MarketDataBundle（省略時は yf.Ticker から直接取得）"""
         self.ticker = ticker
+        self.bundle = bundle
         self.risk_free_rate = 0.045
         self.day_count = ql.Actual365Fixed()
         self.calendar = ql.UnitedStates(ql.UnitedStates.NYSE)
@@ -20,7 +24,7 @@ class TimeSeriesQuantLibAnalyzer:
     def fetch_history(self):
         """Fetch 1 year of daily history."""
         try:
-            self.stock = yf.Ticker(self.ticker)
+            self.stock = self.bundle if self.bundle is not None else yf.Ticker(self.ticker)
             self.hist = self.stock.history(period="1y")
             if self.hist.empty:
                 return False
@@ -40,76 +44,13 @@ class TimeSeriesQuantLibAnalyzer:
         # We calculate the theoretical price of a "1-month Straddle" (ATM Call + ATM Put)
         # using HV as the volatility input. This represents the "Expected Move" cost.
 
-        expected_moves = []
-        downside_probs = []
-        upside_probs = []
-
-        for date_idx, row in self.hist.iterrows():
-            price = row['Close']
-            vol = row['HV_20d']
-
-            if pd.isna(vol) or vol == 0:
-                expected_moves.append(np.nan)
-                downside_probs.append(np.nan)
-                upside_probs.append(np.nan)
-                continue
-
-            # QuantLib Setup for that specific day
-            ql_date = ql.Date(date_idx.day, date_idx.month, date_idx.year)
-            ql.Settings.instance().evaluationDate = ql_date
-
-            # Expiry 30 days out
-            expiry_date = ql_date + 30
-
-            spot_handle = ql.QuoteHandle(ql.SimpleQuote(price))
-            rate_handle = ql.YieldTermStructureHandle(ql.FlatForward(ql_date, self.risk_free_rate, self.day_count))
-            div_handle = ql.YieldTermStructureHandle(ql.FlatForward(ql_date, 0.0, self.day_count))
-            vol_handle = ql.BlackVolTermStructureHandle(ql.BlackConstantVol(ql_date, self.calendar, vol, self.day_count))
-
-            bs_process = ql.BlackScholesMertonProcess(spot_handle, div_handle, rate_handle, vol_handle)
-            engine = ql.AnalyticEuropeanEngine(bs_process)
-            exercise = ql.EuropeanExercise(expiry_date)
-
-            # 1. Expected Move (ATM Straddle Price)
-            # Call
-            c_payoff = ql.PlainVanillaPayoff(ql.Option.Call, price)
-            c_option = ql.VanillaOption(c_payoff, exercise)
-            c_option.setPricingEngine(engine)
-            # Put
-            p_payoff = ql.PlainVanillaPayoff(ql.Option.Put, price)
-            p_option = ql.VanillaOption(p_payoff, exercise)
-            p_option.setPricingEngine(engine)
-
-            straddle_price = c_option.NPV() + p_option.NPV()
-            expected_move_pct = (straddle_price / price) * 100
-            expected_moves.append(expected_move_pct)
-
-            # 2. Probability Skew Proxy (Theoretical)
-            # Calculate Prob of -10% vs +10% using the HV
-            # Down (-10%)
-            target_down = price * 0.90
-            bin_payoff_down = ql.CashOrNothingPayoff(ql.Option.Put, target_down, 1.0)
-            bin_opt_down = ql.VanillaOption(bin_payoff_down, exercise)
-            bin_opt_down.setPricingEngine(engine)
-
-            # Up (+10%)
-            target_up = price * 1.10
-            bin_payoff_up = ql.CashOrNothingPayoff(ql.Option.Call, target_up, 1.0)
-            bin_opt_up = ql.VanillaOption(bin_payoff_up, exercise)
-            bin_opt_up.setPricingEngine(engine)
-
-            # Discount back to get probability roughly (or just use NPV as risk-neutral prob * discount)
-            # We want raw probability N(d2) approx.
-            # NPV = Prob * exp(-rT) -> Prob = NPV * exp(rT)
-            time_to_expiry = self.day_count.yearFraction(ql_date, expiry_date)
-            disc = math.exp(self.risk_free_rate * time_to_expiry)
-
-            downside_probs.append(bin_opt_down.NPV() * disc * 100)
-            upside_probs.append(bin_opt_up.NPV() * disc * 100)
-
-        self.hist['Expected_Move_30d_Pct'] = expected_moves
-        self.hist['Prob_Down_10pct'] = downside_probs
-        self.hist['Prob_Up_10pct'] = upside_probs
+        # Vectorized over all days (same result as pricing each day with QuantLib's
+        # AnalyticEuropeanEngine, without touching the global evaluation date).
+        # Probabilities are the cash-or-nothing NPVs discounted back, i.e. N(-d2) / N(d2).
+        metrics = black_scholes.historical_risk_metrics(
+            self.hist['Close'], self.hist['HV_20d'], self.risk_free_rate, 0.0)
+        for col in metrics.columns:
+            self.hist[col] = metrics[col]
         self.hist['Skew_Bias'] = self.hist['Prob_Down_10pct'] - self.hist['Prob_Up_10pct']
 
     def plot_analysis(self, output_dir='.'):
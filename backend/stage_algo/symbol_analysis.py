@@ -0,0 +1,75 @@
+"""
+StageAlgo symbol analysis
+
+GammaPlotter / QuantLibAnalyzer / TimeSeriesQuantLibAnalyzer をまとめて1銘柄に実行します。
+QuantLibの評価日（ql.Settings）とmatplotlibはプロセス全体で共有される状態のため、
+複数銘柄を並列に分析する場合はプロセスプールのワーカーとして呼び出します
+（ワーカーから pickle できるようモジュールレベルの関数にしています）。
+"""
+
+import os
+from typing import Dict
+
+from .gamma_plotter import GammaPlotter
+from .market_data_bundle import bundle_cache
+from .quantlib_ai_analyzer import QuantLibAnalyzer
+from .quantlib_timeseries_analyzer import TimeSeriesQuantLibAnalyzer
+
+
+def run_stage_algo_tools(ticker: str, output_dir: str) -> Dict:
+    """
+    1銘柄にStageAlgoの3つの分析ツールを実行
+
+    株価履歴・info・オプションチェーンは MarketDataBundle で1回だけ取得し、3つのツールで共有する。
+
+    Args:
+        ticker: ティッカーシンボル
+        output_dir: チャート画像の出力先
+
+    Returns:
+        Dict: volatility_regime, gamma_flip, expected_move_30d, analysis_data
+    """
+    bundle = bundle_cache.get(ticker)
+
+    # 1. Gamma Plotter
+    gp = GammaPlotter(ticker, bundle=bundle)
+    if gp.fetch_data():
+        gp.calculate_current_gamma_levels()
+        gp.calculate_historical_metrics()
+        gamma_plot_path = gp.plot_analysis(output_dir=output_dir)
+        gamma_flip = gp.gamma_flip
+    else:
+        gamma_plot_path = None
+        gamma_flip = None
+
+    # 2. QuantLib AI Analyzer
+    qa = QuantLibAnalyzer(ticker, bundle=bundle)
+    ai_strategy = qa.run() # Returns dict
+
+    # 3. Time Series Analyzer
+    ts = TimeSeriesQuantLibAnalyzer(ticker, bundle=bundle)
+    if ts.fetch_history():
+        ts.calculate_metrics()
+        ts_plot_path = ts.plot_analysis(output_dir=output_dir)
+        ts_report = ts.generate_report()
+        volatility_regime = ts_report.get('cycle_phase', 'transition').lower()
+        if 'contraction' in volatility_regime: volatility_regime = 'contraction'
+        elif 'expansion' in volatility_regime: volatility_regime = 'expansion'
+        else: volatility_regime = 'transition'
+
+        expected_move = ts_report.get('expected_move_30d')
+    else:
+        ts_plot_path = None
+        volatility_regime = 'transition'
+        expected_move = None
+
+    return {
+        'volatility_regime': volatility_regime,
+        'gamma_flip': gamma_flip,
+        'expected_move_30d': expected_move,
+        'analysis_data': {
+            'gamma_plot': f'/charts/algo/{os.path.basename(gamma_plot_path)}' if gamma_plot_path else None,
+            'timeseries_plot': f'/charts/algo/{os.path.basename(ts_plot_path)}' if ts_plot_path else None,
+            'ai_strategy': ai_strategy
+        }
+    }